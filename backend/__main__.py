@@ -0,0 +1,217 @@
+"""
+Offline bulk analysis: run the /upload/analyze pipeline over a directory or archive.
+
+    python -m backend forms/ -o results.jsonl
+    python -m backend archive.zip -o results.jsonl --workers 8
+    python -m backend archive.tar.gz -o results.jsonl --languages hi,en
+
+One JSON record is written per document. The output file doubles as the checkpoint:
+re-running with the same --output skips documents that already have a record, so an
+interrupted run resumes where it stopped. A document that kills its worker process
+gets an error record and the pool is replaced.
+"""
+import argparse
+import json
+import os
+import sys
+import tarfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from backend.batch import crash_record, process_document, worker_init
+
+SUPPORTED_SUFFIXES = {".pdf", ".png", ".jpg", ".jpeg", ".docx"}
+PROGRESS_EVERY_SECONDS = 5.0
+
+
+# ---------- INPUT ----------
+
+def source_kind(source: Path) -> str:
+    """Classify a CLI source as "dir", "zip", "tar" or "file"; ValueError if it can't be read."""
+    if not source.exists():
+        raise ValueError(f"No such file or directory: {source}")
+    if source.is_dir():
+        return "dir"
+    if zipfile.is_zipfile(source):
+        return "zip"
+    if tarfile.is_tarfile(source):
+        return "tar"
+    if source.suffix.lower() in SUPPORTED_SUFFIXES:
+        return "file"
+    raise ValueError(f"Not a directory, archive or supported document: {source}")
+
+
+def iter_sources(source: Path, kind: str):
+    """Yield (source_id, path_or_bytes) for every supported document under `source`."""
+    if kind == "dir":
+        for path in sorted(source.rglob("*")):
+            if path.is_file() and path.suffix.lower() in SUPPORTED_SUFFIXES:
+                yield str(path.relative_to(source)), path
+    elif kind == "zip":
+        with zipfile.ZipFile(source) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and Path(info.filename).suffix.lower() in SUPPORTED_SUFFIXES:
+                    yield f"{source.name}!{info.filename}", zf.read(info)
+    elif kind == "tar":
+        # Streamed in archive order, so compressed tarballs are read only once
+        with tarfile.open(source, "r:*") as tf:
+            for member in tf:
+                if member.isfile() and Path(member.name).suffix.lower() in SUPPORTED_SUFFIXES:
+                    yield f"{source.name}!{member.name}", tf.extractfile(member).read()
+    else:
+        yield source.name, source
+
+
+def load_done(output: Path, retry_errors: bool = False) -> set:
+    done = set()
+    if not output.exists():
+        return done
+    with open(output, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                if retry_errors and record.get("status") == "error":
+                    continue
+                done.add(record["source"])
+            except (ValueError, KeyError):
+                # A torn last line from an interrupted run; that document is redone
+                continue
+    return done
+
+
+# ---------- MAIN ----------
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend", description="Bulk-analyse forms into JSONL")
+    parser.add_argument("source", type=Path, help="directory, .zip/.tar(.gz) archive, or single document")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="JSONL output (also the resume checkpoint)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--languages", help="comma-separated OCR languages, e.g. hi,en")
+    parser.add_argument("--ocr-budget", type=float,
+                        help="OCR time budget per document in seconds (default: PAPERPILOT_OCR_BUDGET_SECONDS)")
+    parser.add_argument("--max-tasks-per-child", type=int, default=200,
+                        help="recycle worker processes after this many documents")
+    parser.add_argument("--retry-errors", action="store_true", help="re-run documents that failed last time")
+    args = parser.parse_args(argv)
+
+    languages = None
+    if args.languages:
+        from backend.app.services.ocr_pool import normalize_languages
+        try:
+            languages = normalize_languages(args.languages.split(","))
+        except ValueError as e:
+            parser.error(str(e))
+
+    try:
+        kind = source_kind(args.source)
+    except ValueError as e:
+        parser.error(str(e))
+
+    done = load_done(args.output, args.retry_errors)
+    if done:
+        print(f"Resuming: {len(done)} documents already in {args.output}", file=sys.stderr)
+
+    read_error = []
+
+    def pending():
+        try:
+            for sid, payload in iter_sources(args.source, kind):
+                if sid not in done:
+                    yield sid, payload
+        except Exception as e:
+            # A damaged archive: stop feeding, finish what was queued, then report it
+            read_error.append(f"{type(e).__name__}: {e}")
+
+    # Worker recycling needs Python 3.11+ (and then uses spawned workers)
+    recycle = {"max_tasks_per_child": args.max_tasks_per_child} if sys.version_info >= (3, 11) else {}
+
+    def new_pool() -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            args.workers, initializer=worker_init, initargs=(languages, args.ocr_budget), **recycle
+        )
+
+    counts = {"ok": 0, "error": 0}
+    started = last_report = time.perf_counter()
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    torn = False
+    if args.output.exists() and args.output.stat().st_size:
+        with open(args.output, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            torn = f.read(1) != b"\n"
+
+    tasks = pending()
+    running = {}  # future -> (source_id, payload)
+    # Documents that were in flight when a worker died; rerun one at a time to find the culprit
+    suspects = deque()
+    pool = new_pool()
+    try:
+        with open(args.output, "a", encoding="utf-8") as out:
+            if torn:
+                out.write("\n")
+
+            def write(record: dict) -> None:
+                nonlocal last_report
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                counts[record["status"]] += 1
+
+                now = time.perf_counter()
+                if now - last_report >= PROGRESS_EVERY_SECONDS:
+                    total = counts["ok"] + counts["error"]
+                    print(f"{total} done ({counts['error']} errors), {total / (now - started):.1f} docs/s",
+                          file=sys.stderr)
+                    last_report = now
+
+            while True:
+                if suspects:
+                    if not running:
+                        task = suspects.popleft()
+                        running[pool.submit(process_document, task)] = task
+                else:
+                    # Bound how many documents are read ahead so archives aren't loaded whole
+                    while len(running) < args.workers * 4 and (task := next(tasks, None)) is not None:
+                        running[pool.submit(process_document, task)] = task
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                if any(isinstance(f.exception(), BrokenProcessPool) for f in finished):
+                    # The whole pool is unusable: settle every in-flight document, then replace it
+                    finished = wait(running).done
+                lost = []
+                for future in finished:
+                    task = running.pop(future)
+                    if isinstance(future.exception(), BrokenProcessPool):
+                        lost.append(task)
+                    else:
+                        write(future.result())
+                if lost:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = new_pool()
+                    if len(lost) == 1:
+                        write(crash_record(lost[0]))
+                    else:
+                        suspects.extend(lost)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    total = counts["ok"] + counts["error"]
+    print(
+        f"Processed {total} documents in {elapsed:.1f}s "
+        f"({total / elapsed if elapsed else 0:.1f} docs/s): {counts['ok']} ok, {counts['error']} errors; "
+        f"{len(done)} skipped from checkpoint",
+        file=sys.stderr,
+    )
+    if read_error:
+        print(f"Stopped reading {args.source}: {read_error[0]}", file=sys.stderr)
+        return 1
+    return 1 if counts["error"] and not counts["ok"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
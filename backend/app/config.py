@@ -1,2 +1,65 @@
+import os
+
 OFFLINE_MODE = True
-LOCAL_FIRST_BADGE = "🔒 Runs locally. Your documents never leave your device."
\ No newline at end of file
+LOCAL_FIRST_BADGE = "🔒 Runs locally. Your documents never leave your device."
+
+# Streaming analysis for very large PDFs (text-layer only)
+STREAM_MIN_PAGES = 40            # documents with at least this many pages are streamed
+STREAM_MAX_PAGES = 1000          # hard page cap for a single analysis
+STREAM_MEMORY_CEILING_MB = 256   # stop early if RSS grows this much during the scan
+STREAM_STALE_PAGE_LIMIT = 30     # stop early after this many pages without a new field
+STREAM_BLANK_PAGE_LIMIT = 3      # hand over to OCR if the first pages have no text layer
+
+# Layout-aware field detection for flat (non-AcroForm) PDFs
+LAYOUT_DETECTION = True
+LAYOUT_MAX_PAGES = 20
+
+# OCR reader pool (one EasyOCR reader per language set)
+OCR_MEMORY_BUDGET_MB = 1500      # resident budget across all loaded readers
+OCR_READER_ESTIMATE_MB = 350     # assumed reader size when RSS can't be measured
+OCR_READER_IDLE_SECONDS = 600    # readers unused for this long are unloaded
+
+# OCR rendering for scanned PDFs
+OCR_RENDER_DPI = 120
+OCR_MAX_PAGES = 10               # pages considered; the time budget decides how much is read
+
+# Deadline-driven progressive OCR
+OCR_TIME_BUDGET_SECONDS = float(os.environ.get("PAPERPILOT_OCR_BUDGET_SECONDS", 20))
+OCR_MAX_TIME_BUDGET_SECONDS = 120  # upper bound for a per-request `ocr_budget`
+OCR_REGION_HEIGHT_PT = 100       # nominal height of the bands pages are split into
+OCR_SECONDS_PER_MEGAPIXEL = 1.5  # initial recognition cost estimate, refined while running
+
+# Admission control for /upload/analyze and /upload/fill
+ADMISSION_MEMORY_BUDGET_MB = int(os.environ.get("PAPERPILOT_MEMORY_BUDGET_MB", 2048))
+ADMISSION_CPU_BUDGET = float(os.environ.get("PAPERPILOT_CPU_BUDGET", os.cpu_count() or 2))
+ADMISSION_MAX_QUEUE = 16         # requests allowed to wait for capacity
+ADMISSION_QUEUE_TIMEOUT = 15     # seconds a request may wait before 429
+ADMISSION_RETRY_AFTER = 5        # Retry-After seconds sent with 429
+
+# Production launcher (backend/serve.py) and cross-worker cache
+PRELOAD_OCR_LANGUAGES = [s for s in os.environ.get("PAPERPILOT_PRELOAD_OCR", "en").split(",") if s.strip()]
+SHARED_CACHE_PATH = os.environ.get("PAPERPILOT_CACHE_PATH", "backend/cache/shared.sqlite3")
+SHARED_CACHE_MAX_ENTRIES = 2000  # per namespace
+
+# Warm PDF templates for /upload/fill by reference
+TEMPLATE_CACHE_MAX_ENTRIES = 32
+TEMPLATE_CACHE_MAX_MB = 128
+
+# Per-field companion guides (/upload/guide), memoised by normalised label
+FIELD_GUIDE_CACHE_SIZE = 4096
+
+# Server-side page previews (/upload/preview)
+PREVIEW_ZOOM_LEVELS = (0.5, 1.0, 1.5, 2.0, 3.0)
+PREVIEW_TILE_SIZE = 512          # tile edge in output pixels
+PREVIEW_CACHE_DIR = os.environ.get("PAPERPILOT_PREVIEW_DIR", "backend/cache/previews")
+PREVIEW_MEMORY_CACHE_MB = 64
+PREVIEW_DISK_CACHE_MB = 512
+
+# Request profiling and slow-request capture
+PROFILE_TOKEN = os.environ.get("PAPERPILOT_PROFILE_TOKEN")  # unset: X-PaperPilot-Profile and /debug/profiles are off
+PROFILE_ALL_REQUESTS = os.environ.get("PAPERPILOT_PROFILE_ALL", "").lower() in ("1", "true", "yes")
+SLOW_REQUEST_SECONDS = float(os.environ.get("PAPERPILOT_SLOW_REQUEST_SECONDS", 8))
+PROFILE_SAMPLE_INTERVAL = 0.01   # seconds between stack samples of in-flight requests
+PROFILE_REPORT_DIR = os.environ.get("PAPERPILOT_PROFILE_DIR", "backend/cache/profiles")
+PROFILE_MAX_REPORTS = 100        # ring size; oldest reports are deleted first
+PROFILE_TOP_FUNCTIONS = 25
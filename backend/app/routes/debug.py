@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from ..utils.profiling import is_privileged, profile_store
+
+router = APIRouter()
+
+
+def require_profile_token(request: Request):
+    # Hidden unless PAPERPILOT_PROFILE_TOKEN is set and sent in X-PaperPilot-Profile
+    if not is_privileged(request.headers):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@router.get("/profiles", dependencies=[Depends(require_profile_token)])
+def list_profiles(limit: int = 20):
+    """Most recent slow/profiled request reports, newest first."""
+    return {"reports": profile_store.list(max(1, min(limit, 200)))}
+
+
+@router.get("/profiles/{report_id}", dependencies=[Depends(require_profile_token)])
+def get_profile(report_id: str):
+    if not report_id.isalnum():
+        raise HTTPException(status_code=404, detail="Report not found")
+    report = profile_store.get(report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return report
@@ -1,16 +1,34 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Body
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, Body, Form, Header, Query
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
 from typing import Dict, Any
-import tempfile
-import os
+import hashlib
+import json
 from pathlib import Path
 import time
 from uuid import uuid4
 import logging
-
-from ..services.pdf_parser import extract_from_pdf, extract_from_docx, extract_from_image
-from ..services.ai_engine import extract_action_steps
-from ..utils.text_cleaner import clean_text
+import re
+from urllib.parse import quote
+
+from ..services.admission import admission, estimate_upload_cost
+from ..services.analysis import build_analysis, extract_bytes, extract_pdf, is_complete, open_pdf
+from ..services.companion_steps import field_guide, step_guide
+from ..services.eligibility import get_questions
+from ..services.ocr_pool import normalize_languages
+from ..services.preview import (
+    TILE_RENDER_COST,
+    field_rects,
+    preview_cache,
+    render_tile,
+    tile_etag,
+    tile_grid,
+)
+from ..services.sessions import create_session, get_session, update_answers
+from ..services.template_cache import template_cache
+from ..utils.profiling import note, stage
+from ..utils.shared_cache import CODE_VERSION, shared_cache
+from ..config import OCR_MAX_TIME_BUDGET_SECONDS, PREVIEW_TILE_SIZE, PREVIEW_ZOOM_LEVELS
 
 router = APIRouter()
 
@@ -21,74 +39,115 @@ ALLOWED_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg", ".docx"}
 
 MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10 MB
 
+MAX_GUIDE_LABEL_LENGTH = 200
+
+# Names produced by /analyze: "<unix time>-<uuid hex><suffix>"
+SAVED_AS_PATTERN = re.compile(r"\d+-[0-9a-f]{32}\.pdf")
+
 # Endpoint to fill a PDF with user data and signature, and return the filled PDF
 @router.post("/fill")
 async def fill_pdf(
-    file: UploadFile = File(...),
+    file: UploadFile = File(None),
     data: str = Body(...),  # JSON stringified dict of field values
-    signature: UploadFile = File(None)
+    signature: UploadFile = File(None),
+    saved_as: str = Form(None),
+    content_hash: str = Form(None),
 ):
     """
-    file: the original PDF
+    file: the original PDF (optional when the template is referenced instead)
+    saved_as: the id returned by /analyze for this PDF
+    content_hash: SHA-256 of a PDF previously sent to /analyze
     data: JSON string of { field_name: value, ... }
     signature: optional signature image file
     """
-    import json
-    import fitz
-    from PIL import Image
-    import io
-
-    # Save uploaded PDF
-    suffix = Path(file.filename).suffix.lower()
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        tmp.write(await file.read())
-        pdf_path = Path(tmp.name)
-
     # Parse data
     try:
         field_data: Dict[str, Any] = json.loads(data)
     except Exception as e:
-        os.unlink(pdf_path)
         raise HTTPException(status_code=400, detail=f"Invalid data: {e}")
+    if not isinstance(field_data, dict):
+        raise HTTPException(status_code=400, detail="Invalid data: expected a JSON object of field values")
+
+    if content_hash and not saved_as:
+        saved_as = await run_in_threadpool(shared_cache.get, "upload", content_hash.lower())
+        if saved_as is None:
+            raise HTTPException(status_code=404, detail="No uploaded PDF matches this content hash")
+
+    if saved_as:
+        # Reuse the stored upload instead of receiving the same bytes again
+        template = await run_in_threadpool(template_cache.get_saved, saved_as, saved_pdf_path(saved_as))
+        session = await run_in_threadpool(get_session, saved_as)
+        filename = (session or {}).get("filename") or saved_as
+    elif file is not None and file.filename:
+        if Path(file.filename).suffix.lower() != ".pdf":
+            raise HTTPException(status_code=400, detail="Only PDF files can be filled")
+        pdf_bytes = await file.read()
+        if not pdf_bytes:
+            raise HTTPException(status_code=400, detail="Empty file uploaded")
+        template = await run_in_threadpool(template_cache.get, pdf_bytes)
+        filename = file.filename
+    else:
+        raise HTTPException(status_code=400, detail="Send the PDF file, its saved_as id, or its content_hash")
+
+    sig_img_bytes = await signature.read() if signature is not None else None
+
+    cost = await run_in_threadpool(estimate_upload_cost, template["bytes"], ".pdf", sig_img_bytes)
+    async with admission.admit(cost):
+        filled = await run_in_threadpool(fill_pdf_document, template, field_data, sig_img_bytes)
+
+    # Return the filled PDF for download
+    return Response(
+        content=filled,
+        media_type="application/pdf",
+        headers={"Content-Disposition": content_disposition(f"filled_{Path(filename).name}")},
+    )
+
+
+def content_disposition(filename: str) -> str:
+    # Headers are latin-1: send an ASCII fallback plus the UTF-8 name (RFC 5987/6266)
+    fallback = "".join(c if " " <= c < "\x7f" and c not in '"\\' else "_" for c in filename)
+    quoted = quote(filename, safe="")
+    if quoted == filename:
+        return f'attachment; filename="{filename}"'
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quoted}"
+
+
+def fill_pdf_document(template: dict, field_data: Dict[str, Any], sig_img_bytes: bytes | None) -> bytes:
+    import fitz
+    from PIL import Image
+    import io
 
-    # Prepare output path
-    filled_path = pdf_path.parent / (pdf_path.stem + "_filled.pdf")
-
-    # Open PDF and fill fields
-    doc = fitz.open(pdf_path)
-    for page in doc:
-        widgets = page.widgets()
-        if widgets:
-            for w in widgets:
-                if w.field_name and w.field_name in field_data:
-                    w.field_value = str(field_data[w.field_name])
+    with stage("fill"):
+        # Open PDF from memory and fill fields through the cached widget index
+        doc = fitz.open(stream=template["bytes"], filetype="pdf")
+        try:
+            pages = {}  # widgets need their page kept alive while they're updated
+            for name, value in field_data.items():
+                for page_index, xref in template["fields"].get(name, []):
+                    page = pages.setdefault(page_index, doc[page_index])
+                    w = page.load_widget(xref)
+                    w.field_value = str(value)
                     w.update()
 
-    # If signature provided, try to place it on a field named 'signature' (case-insensitive)
-    if signature is not None:
-        sig_img_bytes = await signature.read()
-        sig_img = Image.open(io.BytesIO(sig_img_bytes)).convert("RGBA")
-        for page in doc:
-            widgets = page.widgets() or []
-            for w in widgets:
-                if not w.field_name:
-                    continue
-                if 'signature' not in w.field_name.lower():
-                    continue
-
-                rect = w.rect
+            # If signature provided, place it on the first field named 'signature' (case-insensitive) per page
+            if sig_img_bytes is not None and template["signatures"]:
+                sig_img = Image.open(io.BytesIO(sig_img_bytes)).convert("RGBA")
                 # Convert signature to PNG bytes and insert it directly into the widget rectangle.
                 buf = io.BytesIO()
                 sig_img.save(buf, format="PNG")
-                page.insert_image(rect, stream=buf.getvalue(), keep_proportion=False)
-                break
+                for page_index, xref in template["signatures"]:
+                    page = doc[page_index]
+                    page.insert_image(page.load_widget(xref).rect, stream=buf.getvalue(), keep_proportion=False)
 
-    doc.save(str(filled_path))
-    doc.close()
-    os.unlink(pdf_path)
+            return doc.tobytes()
+        finally:
+            doc.close()
 
-    # Return the filled PDF for download
-    return FileResponse(str(filled_path), filename="filled_" + file.filename)
+
+def saved_pdf_path(saved_as: str) -> Path:
+    if not SAVED_AS_PATTERN.fullmatch(saved_as) or not (UPLOAD_DIR / saved_as).is_file():
+        raise HTTPException(status_code=404, detail="Uploaded PDF not found")
+    return UPLOAD_DIR / saved_as
 
 
 def validate_upload(file: UploadFile):
@@ -100,9 +159,25 @@ def validate_upload(file: UploadFile):
 
 
 @router.post("/analyze")
-async def analyze_pdf(file: UploadFile = File(...)):
+async def analyze_pdf(
+    file: UploadFile = File(...),
+    languages: str = Form(None),  # optional comma-separated OCR languages, e.g. "hi,en"
+    ocr_budget: float = Form(None),  # optional OCR time budget in seconds
+):
     validate_upload(file)
 
+    if ocr_budget is not None and not 0 < ocr_budget <= OCR_MAX_TIME_BUDGET_SECONDS:
+        raise HTTPException(
+            status_code=400, detail=f"ocr_budget must be between 0 and {OCR_MAX_TIME_BUDGET_SECONDS} seconds"
+        )
+
+    ocr_languages = None
+    if languages:
+        try:
+            ocr_languages = normalize_languages(languages.split(","))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     original_suffix = Path(file.filename).suffix.lower()
     safe_name = f"{int(time.time())}-{uuid4().hex}{original_suffix}"
     file_path = UPLOAD_DIR / safe_name
@@ -115,94 +190,44 @@ async def analyze_pdf(file: UploadFile = File(...)):
         if len(content) > MAX_UPLOAD_SIZE:
             raise HTTPException(status_code=400, detail="File too large")
 
-        with open(file_path, "wb") as f:
-            f.write(content)
         await file.close()
 
-        suffix = Path(file.filename).suffix.lower()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            tmp.write(content)
-            tmp_path = Path(tmp.name)
-
-        # Now tmp is closed, safe to open and process
+        # Identical documents are analysed once and shared across workers. Only complete
+        # results are cached, and those don't depend on the OCR budget. The code version
+        # retires entries computed by an older deploy
+        content_hash = hashlib.sha256(content).hexdigest()
+        cache_key = f"{CODE_VERSION}:{content_hash}:{','.join(ocr_languages or ())}"
+        cached = await run_in_threadpool(shared_cache.get, "analysis", cache_key)
+        if cached is not None:
+            note(file_type=original_suffix, size_kb=len(content) // 1024, cache_hit=True)
+            with open(file_path, "wb") as f:
+                f.write(content)
+            response = {**cached, "filename": file.filename, "saved_as": safe_name}
+            await run_in_threadpool(remember_upload, safe_name, content_hash, response)
+            return response
+
+        note(file_type=original_suffix, size_kb=len(content) // 1024, cache_hit=False)
+
+        # Heavy work runs in the threadpool, gated by the node's CPU/memory budget. A PDF is
+        # opened once: the same handle serves the cost estimate and the extraction
+        doc = await run_in_threadpool(open_pdf, content) if original_suffix == ".pdf" else None
         try:
-            if suffix in [".pdf"]:
-                extracted = extract_from_pdf(tmp_path)
-            elif suffix in [".jpg", ".jpeg", ".png"]:
-                extracted = extract_from_image(tmp_path)
-            elif suffix in [".docx"]:
-                extracted = extract_from_docx(tmp_path)
-            else:
-                os.unlink(tmp_path)
-                raise HTTPException(status_code=400, detail="Unsupported file type")
+            cost = await run_in_threadpool(estimate_upload_cost, content, original_suffix, None, doc)
+            async with admission.admit(cost):
+                with open(file_path, "wb") as f:
+                    f.write(content)
+                if doc is not None:
+                    extracted = await run_in_threadpool(extract_pdf, doc, ocr_languages, ocr_budget)
+                else:
+                    extracted = await run_in_threadpool(extract_bytes, content, original_suffix, ocr_languages, ocr_budget)
+                response = await run_in_threadpool(build_analysis_response, file.filename, safe_name, extracted)
         finally:
-            try:
-                os.unlink(tmp_path)
-            except Exception:
-                pass
-
-        # Build a stable response schema used by the frontend
-        if "text" in extracted and extracted.get("text"):
-            cleaned = clean_text(extracted.get("text", ""))
-            result = extract_action_steps(cleaned)
-            return {
-                "filename": file.filename,
-                "saved_as": safe_name,
-                "extraction_method": extracted.get("method"),
-                "action_overview": result.get("overview", "Document Analysis"),
-                "total_steps": result.get("total_steps", len(result.get("steps", []))),
-                "mandatory": result.get("mandatory", 0),
-                "optional": result.get("optional", 0),
-                "steps": result.get("steps", []),
-            }
-
-        if "fields" in extracted and extracted.get("fields"):
-            # Convert fillable field metadata into a single “fillable fields” step.
-            fields = []
-            for f in extracted.get("fields", []):
-                label = f.get("label") or f.get("name") or "Field"
-                fields.append({
-                    "name": f.get("name"),
-                    "label": label,
-                    "tip": "Fill exactly as requested on the form.",
-                    "suggested_answer": "",
-                })
-
-            steps = [
-                {
-                    "id": 1,
-                    "title": "Fillable Fields",
-                    "required": True,
-                    "risk": "medium",
-                    "risk_reason": "These fields were detected from the PDF’s fillable form controls.",
-                    "remediation_tip": "Review each field carefully before downloading the filled PDF.",
-                    "what_to_do": "Fill the fields below.",
-                    "fields": fields,
-                    "companion": "Fill each field carefully. Use the guidance for format and common mistakes.",
-                }
-            ]
-
-            return {
-                "filename": file.filename,
-                "saved_as": safe_name,
-                "extraction_method": extracted.get("method"),
-                "action_overview": "Fillable fields detected",
-                "total_steps": 1,
-                "mandatory": 1,
-                "optional": 0,
-                "steps": steps,
-            }
-
-        return {
-            "filename": file.filename,
-            "saved_as": safe_name,
-            "extraction_method": extracted.get("method"),
-            "action_overview": "No fields detected",
-            "total_steps": 0,
-            "mandatory": 0,
-            "optional": 0,
-            "steps": [],
-        }
+            if doc is not None:
+                doc.close()
+        if is_complete(response):
+            await run_in_threadpool(shared_cache.set, "analysis", cache_key, response)
+        await run_in_threadpool(remember_upload, safe_name, content_hash, response)
+        return response
 
     except HTTPException:
         raise
@@ -211,4 +236,122 @@ async def analyze_pdf(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/questions")
+def applicant_questions():
+    return {"questions": get_questions()}
+
 
+@router.get("/sessions/{saved_as}")
+def analysis_session(saved_as: str):
+    session = get_session(saved_as)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Analysis session not found")
+    return session
+
+
+@router.post("/sessions/{saved_as}/answers")
+def session_answers(saved_as: str, answers: Dict[str, Any] = Body(...)):
+    """
+    answers: { question_key: value, ... } (see /upload/questions); merged into earlier answers.
+    Returns only the steps whose required/applicability changed.
+    """
+    try:
+        diff = update_answers(saved_as, answers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if diff is None:
+        raise HTTPException(status_code=404, detail="Analysis session not found")
+    return diff
+
+
+@router.get("/sessions/{saved_as}/steps/{step_id}/guide")
+def session_step_guide(saved_as: str, step_id: int):
+    """Companion guides for every field of one analysed step, built when the UI opens it."""
+    session = get_session(saved_as)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Analysis session not found")
+    step = next((s for s in session["steps"] if s["id"] == step_id), None)
+    if step is None:
+        raise HTTPException(status_code=404, detail="Step not found")
+    return step_guide(step)
+
+
+@router.get("/guide")
+def label_guide(response: Response, label: str = Query(..., min_length=1, max_length=MAX_GUIDE_LABEL_LENGTH)):
+    """
+    Companion guide for one field label (what it is, how to fill it, where to find it,
+    common mistakes, an example). Guides are memoised by normalised label.
+    """
+    if not label.strip():
+        raise HTTPException(status_code=400, detail="Empty label")
+    # Guides depend only on the label, so browsers may reuse them
+    response.headers["Cache-Control"] = "public, max-age=86400"
+    return field_guide(label.strip())
+
+
+@router.get("/preview/{saved_as}")
+async def preview_info(saved_as: str):
+    """Page sizes and tile grid parameters for rendering previews of an uploaded PDF."""
+    template = await run_in_threadpool(template_cache.get_saved, saved_as, saved_pdf_path(saved_as))
+    sizes = await run_in_threadpool(preview_cache.page_sizes, template["key"], template["bytes"])
+    return {
+        "saved_as": saved_as,
+        "tile_size": PREVIEW_TILE_SIZE,
+        "zoom_levels": list(PREVIEW_ZOOM_LEVELS),
+        "pages": [{"index": i, "width": w, "height": h} for i, (w, h) in enumerate(sizes)],
+    }
+
+
+@router.get("/preview/{saved_as}/{page}")
+async def preview_tile(
+    saved_as: str,
+    page: int,
+    zoom: float = Query(1.0),
+    col: int = Query(0, ge=0),
+    row: int = Query(0, ge=0),
+    highlight: bool = Query(True),
+    if_none_match: str = Header(None),
+):
+    """
+    One PNG tile (PREVIEW_TILE_SIZE px square, clipped at the page edge) of a page of an
+    uploaded PDF, with detected field rects highlighted. Served with a strong ETag;
+    repeat requests are answered from the tile cache or with 304.
+    """
+    if zoom not in PREVIEW_ZOOM_LEVELS:
+        raise HTTPException(status_code=400, detail=f"zoom must be one of {list(PREVIEW_ZOOM_LEVELS)}")
+
+    template = await run_in_threadpool(template_cache.get_saved, saved_as, saved_pdf_path(saved_as))
+    sizes = await run_in_threadpool(preview_cache.page_sizes, template["key"], template["bytes"])
+    if not 0 <= page < len(sizes):
+        raise HTTPException(status_code=404, detail="Page not found")
+    cols, rows = tile_grid(sizes[page], zoom)
+    if col >= cols or row >= rows:
+        raise HTTPException(status_code=404, detail="Tile not found")
+
+    rects = []
+    if highlight:
+        session = await run_in_threadpool(get_session, saved_as)
+        rects = field_rects((session or {}).get("steps", []), page)
+
+    etag = tile_etag(template["key"], page, zoom, col, row, rects)
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    png = await run_in_threadpool(preview_cache.get, etag)
+    if png is None:
+        async with admission.admit(TILE_RENDER_COST):
+            png = await run_in_threadpool(render_tile, template["bytes"], page, zoom, col, row, rects)
+        await run_in_threadpool(preview_cache.put, etag, png)
+    return Response(content=png, media_type="image/png", headers=headers)
+
+
+def remember_upload(safe_name: str, content_hash: str, response: dict) -> None:
+    # Lets later requests (answers, fill) refer to this upload by saved_as or content hash
+    create_session(safe_name, response)
+    if safe_name.endswith(".pdf"):
+        shared_cache.set("upload", content_hash, safe_name)
+
+
+def build_analysis_response(filename: str, safe_name: str, extracted: dict) -> dict:
+    return {"filename": filename, "saved_as": safe_name, **build_analysis(extracted)}
@@ -0,0 +1,505 @@
+"""
+AcroForm field extraction straight from the PDF object tree.
+
+`page.widgets()` builds a Widget object (and its appearance/font state) for every
+annotation on every page. Here the /AcroForm /Fields tree is walked once, reading
+each object's source and parsing it locally, with inherited attributes resolved on
+the way down. The result is stored column-wise in a FieldTable: one row per
+terminal field, plus a flat widget index used for filling.
+"""
+import re
+from array import array
+
+import fitz  # PyMuPDF
+
+# Field flags (PDF 32000-1, 12.7.3.1 and 12.7.4)
+FF_READ_ONLY = 1 << 0
+FF_REQUIRED = 1 << 1
+FF_RADIO = 1 << 15
+FF_PUSHBUTTON = 1 << 16
+FF_COMBO = 1 << 17
+
+TYPE_NAMES = {
+    fitz.PDF_WIDGET_TYPE_UNKNOWN: "unknown",
+    fitz.PDF_WIDGET_TYPE_BUTTON: "button",
+    fitz.PDF_WIDGET_TYPE_CHECKBOX: "checkbox",
+    fitz.PDF_WIDGET_TYPE_COMBOBOX: "combobox",
+    fitz.PDF_WIDGET_TYPE_LISTBOX: "listbox",
+    fitz.PDF_WIDGET_TYPE_RADIOBUTTON: "radiobutton",
+    fitz.PDF_WIDGET_TYPE_SIGNATURE: "signature",
+    fitz.PDF_WIDGET_TYPE_TEXT: "text",
+}
+
+# Attributes a field inherits from its ancestors
+INHERITED_KEYS = ("FT", "Ff", "V", "DV", "Opt", "MaxLen")
+
+# Guards against malformed trees
+MAX_DEPTH = 32
+
+_NAME_ESCAPE = re.compile(r"#([0-9A-Fa-f]{2})")
+
+# One alternative per token kind, dispatched on the group that matched (lastindex).
+# Literal strings may nest parentheses one level deep; deeper nesting is read by hand
+_TOKEN = re.compile(
+    rb"(\d+)\s+\d+\s+R(?![A-Za-z])|(<<)|(>>)|(\[)|(\])"
+    rb"|\(((?:[^()\\]|\\.|\((?:[^()\\]|\\.)*\))*)\)|(\()|<([0-9A-Fa-f\s]*)>"
+    rb"|(/[^\s/\[\]()<>{}%]*)|([+-]?\d+)(?![.\d])|([+-]?(?:\d+\.\d*|\.\d+))|([A-Za-z]+)",
+    re.S,
+)
+(_T_REF, _T_DICT_OPEN, _T_DICT_CLOSE, _T_ARRAY_OPEN, _T_ARRAY_CLOSE, _T_STRING, _T_NESTED_STRING,
+ _T_HEX, _T_NAME, _T_INT, _T_REAL, _T_KEYWORD) = range(1, 13)
+_WHITESPACE = re.compile(rb"\s")
+_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f"}
+
+
+class Ref(int):
+    """An indirect reference ("12 0 R") inside a parsed object."""
+
+
+class Name(str):
+    """A PDF name, without its leading slash (strings stay plain str)."""
+
+
+def _decode_pdf_string(raw: bytes) -> str:
+    if raw.startswith(b"\xfe\xff"):
+        return raw[2:].decode("utf-16-be", errors="replace")
+    if raw.startswith(b"\xef\xbb\xbf"):
+        return raw[3:].decode("utf-8", errors="replace")
+    # PDFDocEncoding agrees with Latin-1 for everything that matters in form fields
+    return raw.decode("latin-1")
+
+
+def _decode_name(name: bytes) -> Name:
+    text = name[1:].decode("latin-1")
+    return Name(_NAME_ESCAPE.sub(lambda m: chr(int(m.group(1), 16)), text) if "#" in text else text)
+
+
+def _read_literal(data: bytes, pos: int) -> tuple[bytes, int]:
+    # `pos` is just past the opening parenthesis; returns (string bytes, position after it)
+    out = bytearray()
+    depth = 1
+    while pos < len(data):
+        c = data[pos:pos + 1]
+        pos += 1
+        if c == b"\\":
+            nxt = data[pos:pos + 1]
+            pos += 1
+            if nxt in _ESCAPES:
+                out += _ESCAPES[nxt]
+            elif nxt.isdigit():
+                end = pos
+                while end < len(data) and end - pos < 2 and data[end:end + 1].isdigit():
+                    end += 1
+                out.append(int(data[pos - 1:end], 8) & 0xFF)
+                pos = end
+            elif nxt in (b"\r", b"\n"):
+                if nxt == b"\r" and data[pos:pos + 1] == b"\n":
+                    pos += 1
+            else:
+                out += nxt
+        elif c == b"(":
+            depth += 1
+            out += c
+        elif c == b")":
+            depth -= 1
+            if depth == 0:
+                break
+            out += c
+        else:
+            out += c
+    return bytes(out), pos
+
+
+def _close(container: list, is_dict: bool):
+    if not is_dict:
+        return container
+    # Dictionaries alternate key, value; a dangling key is dropped
+    return {container[i]: container[i + 1] for i in range(0, len(container) - 1, 2)}
+
+
+def _unescape(raw: bytes) -> bytes:
+    return _read_literal(raw + b")", 0)[0] if b"\\" in raw else raw
+
+
+def parse_pdf_object(text) -> object:
+    """
+    Parse the source of a PDF object (as returned by `xref_object`) into Python values.
+
+    Dictionaries become dicts keyed by name, arrays lists, strings str (decoded), names
+    `Name`, numbers int/float and indirect references `Ref`. Stream data isn't read.
+    """
+    data = text.encode("latin-1", errors="replace") if isinstance(text, str) else text
+    stack = [([], False)]
+    items = stack[-1][0]
+    pos = 0
+    while pos is not None:
+        resume, pos = pos, None
+        for m in _TOKEN.finditer(data, resume):
+            kind = m.lastindex
+            if kind == _T_NAME:
+                items.append(_decode_name(m.group(kind)))
+            elif kind == _T_REF:
+                items.append(Ref(m.group(kind)))
+            elif kind == _T_INT:
+                items.append(int(m.group(kind)))
+            elif kind == _T_STRING:
+                items.append(_decode_pdf_string(_unescape(m.group(kind))))
+            elif kind == _T_DICT_OPEN or kind == _T_ARRAY_OPEN:
+                stack.append(([], kind == _T_DICT_OPEN))
+                items = stack[-1][0]
+            elif kind == _T_DICT_CLOSE or kind == _T_ARRAY_CLOSE:
+                if len(stack) > 1:
+                    done, is_dict = stack.pop()
+                    items = stack[-1][0]
+                    items.append(_close(done, is_dict))
+            elif kind == _T_KEYWORD:
+                keyword = m.group(kind)
+                if keyword in (b"true", b"false"):
+                    items.append(keyword == b"true")
+                elif keyword == b"null":
+                    items.append(None)
+                elif keyword == b"stream":
+                    break
+            elif kind == _T_REAL:
+                items.append(float(m.group(kind)))
+            elif kind == _T_HEX:
+                digits = _WHITESPACE.sub(b"", m.group(kind))
+                if len(digits) % 2:
+                    digits += b"0"
+                items.append(_decode_pdf_string(bytes.fromhex(digits.decode())))
+            elif kind == _T_NESTED_STRING:
+                # Deeply nested parentheses: read the string by hand and resume after it
+                raw, pos = _read_literal(data, m.end())
+                items.append(_decode_pdf_string(raw))
+                break
+    while len(stack) > 1:
+        # Unterminated containers: keep what was read
+        done, is_dict = stack.pop()
+        stack[-1][0].append(_close(done, is_dict))
+    values = stack[0][0]
+    return values[0] if len(values) == 1 else values
+
+
+class _Objects:
+    """Parsed objects of one document, each read and parsed at most once."""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.xref_length = doc.xref_length()
+        self._cache = {}
+
+    def get(self, xref: int):
+        if xref in self._cache:
+            return self._cache[xref]
+        value = None
+        if 0 < xref < self.xref_length:
+            try:
+                value = parse_pdf_object(self.doc.xref_object(xref, compressed=True))
+            except Exception:
+                value = None
+        self._cache[xref] = value
+        return value
+
+    def resolve(self, value, depth: int = 0):
+        while isinstance(value, Ref) and depth < MAX_DEPTH:
+            value = self.get(value)
+            depth += 1
+        return value
+
+    def dict(self, xref: int) -> dict:
+        value = self.resolve(self.get(xref))
+        return value if isinstance(value, dict) else {}
+
+    def refs(self, value) -> list[int]:
+        value = self.resolve(value)
+        return [v for v in value if isinstance(v, Ref)] if isinstance(value, list) else []
+
+
+def _option_text(objects: _Objects, item) -> tuple[str, str]:
+    # Opt entries are either "display" or ["export", "display"]
+    item = objects.resolve(item)
+    if isinstance(item, list) and len(item) >= 2:
+        export, display = objects.resolve(item[0]), objects.resolve(item[1])
+    else:
+        export = display = item
+    return ("" if export is None else str(export)), ("" if display is None else str(display))
+
+
+def _on_states(objects: _Objects, widget: dict) -> list[str]:
+    # Checkbox/radio "on" values are the non-Off keys of the normal appearance dictionary
+    appearance = objects.resolve(widget.get("AP"))
+    normal = objects.resolve(appearance.get("N")) if isinstance(appearance, dict) else None
+    if not isinstance(normal, dict):
+        return []
+    return [state for state in normal if state != "Off"]
+
+
+def _widget_type(field_type: str | None, flags: int) -> int:
+    if field_type == "Tx":
+        return fitz.PDF_WIDGET_TYPE_TEXT
+    if field_type == "Btn":
+        if flags & FF_PUSHBUTTON:
+            return fitz.PDF_WIDGET_TYPE_BUTTON
+        if flags & FF_RADIO:
+            return fitz.PDF_WIDGET_TYPE_RADIOBUTTON
+        return fitz.PDF_WIDGET_TYPE_CHECKBOX
+    if field_type == "Ch":
+        return fitz.PDF_WIDGET_TYPE_COMBOBOX if flags & FF_COMBO else fitz.PDF_WIDGET_TYPE_LISTBOX
+    if field_type == "Sig":
+        return fitz.PDF_WIDGET_TYPE_SIGNATURE
+    return fitz.PDF_WIDGET_TYPE_UNKNOWN
+
+
+def _as_text(value) -> str | None:
+    if value is None or isinstance(value, (dict, Ref)):
+        return None
+    if isinstance(value, list):
+        return ", ".join(str(v) for v in value if isinstance(v, str))
+    return str(value)
+
+
+class FieldTable:
+    """
+    Terminal form fields in parallel columns, plus a flat widget index.
+
+    Field rows are in tab order; `rects` holds four coordinates per field (the first
+    widget, in page space as PyMuPDF reports it). Widget rows point back to their
+    field and are in page/annotation order.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.labels = []
+        self.types = array("b")
+        self.flags = array("q")
+        self.pages = array("i")
+        self.rects = array("d")
+        self.max_lengths = array("i")  # -1: no limit
+        self.values = []
+        self.defaults = []
+        self.options = []       # None or [display, ...]
+        self.option_values = []  # None or [export, ...] when any differs from its display text
+        self.widget_field = array("i")
+        self.widget_xref = array("i")
+        self.widget_page = array("i")
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def record(self, i: int) -> dict:
+        type_code = self.types[i]
+        flags = self.flags[i]
+        record = {
+            "name": self.names[i],
+            "type": type_code,
+            "type_name": TYPE_NAMES.get(type_code, "unknown"),
+            "label": self.labels[i],
+            "page": self.pages[i],
+            "rect": list(self.rects[4 * i:4 * i + 4]),
+            "required": bool(flags & FF_REQUIRED),
+            "read_only": bool(flags & FF_READ_ONLY),
+            "tab_index": i,
+        }
+        if self.options[i]:
+            record["options"] = self.options[i]
+            if self.option_values[i]:
+                record["option_values"] = self.option_values[i]
+        if self.max_lengths[i] >= 0:
+            record["max_length"] = self.max_lengths[i]
+        if self.values[i] is not None:
+            record["value"] = self.values[i]
+        if self.defaults[i] is not None:
+            record["default"] = self.defaults[i]
+        return record
+
+    def records(self) -> list[dict]:
+        return [self.record(i) for i in range(len(self))]
+
+    def widget_index(self) -> dict:
+        """Field name -> [(page_index, widget_xref), ...] and the per-page signature widgets."""
+        fields = {}
+        signatures = []
+        signed_pages = set()
+        for field, xref, page in zip(self.widget_field, self.widget_xref, self.widget_page):
+            name = self.names[field]
+            fields.setdefault(name, []).append((page, xref))
+            # Only the first signature field per page receives the image
+            if page not in signed_pages and "signature" in name.lower():
+                signatures.append((page, xref))
+                signed_pages.add(page)
+        return {"fields": fields, "signatures": signatures}
+
+
+def _annotation_positions(objects: _Objects) -> tuple[dict, list]:
+    # widget xref -> (page index, position in /Annots); plus each page's /Tabs order
+    doc = objects.doc
+    positions = {}
+    tabs = []
+    for page_index in range(doc.page_count):
+        page = objects.dict(doc.page_xref(page_index))
+        for pos, xref in enumerate(objects.refs(page.get("Annots"))):
+            positions.setdefault(xref, (page_index, pos))
+        order = objects.resolve(page.get("Tabs"))
+        tabs.append(order if isinstance(order, Name) else "")
+    return positions, tabs
+
+
+def _walk_fields(objects: _Objects, roots: list[int], positions: dict) -> list[tuple]:
+    # Depth-first over the field tree, in /Fields and /Kids order
+    rows = []
+    seen = set()
+    stack = [(xref, "", {}, 0) for xref in reversed(roots)]
+    while stack:
+        xref, parent_name, inherited, depth = stack.pop()
+        if xref in seen or depth > MAX_DEPTH:
+            continue
+        seen.add(xref)
+        node = objects.dict(xref)
+        if not node:
+            continue
+
+        attrs = dict(inherited)
+        for key in INHERITED_KEYS:
+            if key in node:
+                attrs[key] = node[key]
+        name = parent_name
+        if "T" in node:
+            part = objects.resolve(node["T"])
+            part = "" if part is None else str(part)
+            name = f"{parent_name}.{part}" if parent_name else part
+
+        kids = objects.refs(node.get("Kids"))
+        child_fields = [k for k in kids if "T" in objects.dict(k)]
+        if child_fields:
+            # Non-terminal field: its named kids are fields in their own right
+            for kid in reversed(child_fields):
+                stack.append((kid, name, attrs, depth + 1))
+            continue
+        if not name:
+            continue
+
+        # Terminal field: it is its own widget, or its unnamed kids are
+        widgets = [k for k in kids if k not in seen] or [xref]
+        seen.update(widgets)
+        placed = sorted((positions[w], w) for w in widgets if w in positions)
+        if placed:
+            rows.append((name, node, attrs, placed))
+    return rows
+
+
+def read_field_table(doc) -> FieldTable:
+    """
+    Walk the AcroForm field tree of an open document into a FieldTable.
+
+    Each object is read once with `xref_object` and parsed here, which is much cheaper
+    than one `xref_get_key` call per attribute. Only fields with at least one widget
+    placed on a page are kept, matching what `page.widgets()` reports. Returns an empty
+    table for documents without /AcroForm fields.
+    """
+    table = FieldTable()
+    if not doc.is_pdf:
+        return table
+    objects = _Objects(doc)
+    acroform = objects.resolve(objects.dict(doc.pdf_catalog()).get("AcroForm"))
+    roots = objects.refs(acroform.get("Fields")) if isinstance(acroform, dict) else []
+    if not roots:
+        return table
+
+    positions, tabs = _annotation_positions(objects)
+    rows = _walk_fields(objects, roots, positions)
+
+    matrices = {}
+    rects = []
+    for _, _, _, placed in rows:
+        page_index = placed[0][0][0]
+        if page_index not in matrices:
+            # PDF space to page space; also accounts for the crop box and rotation
+            matrices[page_index] = doc[page_index].transformation_matrix
+        raw = objects.resolve(objects.dict(placed[0][1]).get("Rect"))
+        raw = raw if isinstance(raw, list) and len(raw) == 4 and all(isinstance(v, (int, float)) for v in raw) else (0, 0, 0, 0)
+        rect = fitz.Rect(raw) * matrices[page_index]
+        rect.normalize()
+        rects.append(rect)
+
+    def tab_key(i):
+        page_index, pos = rows[i][3][0][0]
+        order = tabs[page_index]
+        rect = rects[i]
+        if order == "R":
+            return page_index, round(rect.y0), rect.x0, pos
+        if order == "C":
+            return page_index, round(rect.x0), rect.y0, pos
+        return page_index, pos
+
+    for field_index, i in enumerate(sorted(range(len(rows)), key=tab_key)):
+        name, node, attrs, placed = rows[i]
+        field_type = objects.resolve(attrs.get("FT"))
+        flags = objects.resolve(attrs.get("Ff"))
+        flags = flags if isinstance(flags, int) else 0
+        type_code = _widget_type(field_type, flags)
+
+        label = objects.resolve(node.get("TU"))
+        table.names.append(name)
+        table.labels.append(str(label) if isinstance(label, str) and label else name)
+        table.types.append(type_code)
+        table.flags.append(flags & 0xFFFFFFFF)
+        table.pages.append(placed[0][0][0])
+        table.rects.extend(rects[i])
+        max_length = objects.resolve(attrs.get("MaxLen"))
+        table.max_lengths.append(max_length if isinstance(max_length, int) and max_length >= 0 else -1)
+        table.values.append(_as_text(objects.resolve(attrs.get("V"))))
+        table.defaults.append(_as_text(objects.resolve(attrs.get("DV"))))
+
+        exports = displays = None
+        opt = objects.resolve(attrs.get("Opt"))
+        if type_code in (fitz.PDF_WIDGET_TYPE_COMBOBOX, fitz.PDF_WIDGET_TYPE_LISTBOX) and isinstance(opt, list):
+            pairs = [_option_text(objects, item) for item in opt]
+            displays = [d for _, d in pairs]
+            exports = [e for e, _ in pairs]
+        elif type_code == fitz.PDF_WIDGET_TYPE_RADIOBUTTON:
+            # A radio group's choices are the "on" states of its widgets
+            displays = []
+            for _, widget in placed:
+                for state in _on_states(objects, objects.dict(widget)):
+                    if state not in displays:
+                        displays.append(state)
+            exports = displays
+        table.options.append(displays or None)
+        table.option_values.append(exports if displays and exports != displays else None)
+
+        for (page_index, _), widget in placed:
+            table.widget_field.append(field_index)
+            table.widget_xref.append(widget)
+            table.widget_page.append(page_index)
+
+    # Widget rows in page/annotation order, as page.widgets() would visit them
+    order = sorted(range(len(table.widget_xref)), key=lambda i: positions[table.widget_xref[i]])
+    table.widget_field = array("i", (table.widget_field[i] for i in order))
+    table.widget_xref = array("i", (table.widget_xref[i] for i in order))
+    table.widget_page = array("i", (table.widget_page[i] for i in order))
+    return table
+
+
+def read_widget_fields(doc) -> list[dict]:
+    # Fallback for widgets that aren't reachable from /AcroForm /Fields
+    fields = []
+    for page in doc:
+        for w in page.widgets() or []:
+            if w.field_name:
+                fields.append({
+                    "name": w.field_name,
+                    "type": w.field_type,
+                    "type_name": TYPE_NAMES.get(w.field_type, "unknown"),
+                    "label": w.field_label or w.field_name,
+                    "page": page.number,
+                    "rect": list(w.rect),
+                })
+    return fields
+
+
+def extract_form_fields(doc) -> list[dict]:
+    """Fillable fields of an open document, in tab order, with options and constraints."""
+    table = read_field_table(doc)
+    if len(table):
+        return table.records()
+    return read_widget_fields(doc)
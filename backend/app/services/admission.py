@@ -0,0 +1,199 @@
+import asyncio
+import io
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+
+from ..utils.profiling import add_stage
+
+from ..config import (
+    ADMISSION_CPU_BUDGET,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_MEMORY_BUDGET_MB,
+    ADMISSION_QUEUE_TIMEOUT,
+    ADMISSION_RETRY_AFTER,
+    OCR_MAX_PAGES,
+    OCR_RENDER_DPI,
+)
+
+MB = 1024 * 1024
+
+# Rough multipliers from observed peaks: an RGB raster is 3 bytes/pixel, and EasyOCR's
+# detector/recogniser tensors add several float32 copies of the resized image on top.
+OCR_BYTES_PER_PIXEL = 3 * 8
+PARSE_BYTES_PER_FILE_BYTE = 6
+BASE_REQUEST_MB = 20
+# OCR keeps several torch threads busy; text-layer parsing is single-threaded
+OCR_CPU_COST = 2.0
+
+
+def _pdf_cost(content: bytes, doc=None) -> tuple[float, float]:
+    import fitz
+
+    # Reuse the caller's open document when there is one; it is only closed here if opened here
+    owned = doc is None
+    if owned:
+        doc = fitz.open(stream=content, filetype="pdf")
+    try:
+        page_count = len(doc)
+        has_text = any(doc.load_page(i).get_text().strip() for i in range(min(page_count, 3)))
+        if doc.is_form_pdf or has_text:
+            # Text-layer/AcroForm: parse cost scales with size and page count
+            return len(content) * PARSE_BYTES_PER_FILE_BYTE / MB + page_count * 0.05, 1.0
+        # Scanned: the OCR path renders up to OCR_MAX_PAGES pages at OCR_RENDER_DPI
+        scale = (OCR_RENDER_DPI / 72.0) ** 2
+        ocr_pages = min(page_count, OCR_MAX_PAGES)
+        pixels = max((doc.load_page(i).rect.get_area() * scale for i in range(ocr_pages)), default=0.0)
+        return pixels * OCR_BYTES_PER_PIXEL / MB, OCR_CPU_COST
+    finally:
+        if owned:
+            doc.close()
+
+
+def _image_pixels(content: bytes) -> int:
+    from PIL import Image
+
+    # Only the header is read here; width/height are enough for the estimate
+    with Image.open(io.BytesIO(content)) as img:
+        width, height = img.size
+    return width * height
+
+
+def estimate_upload_cost(content: bytes, suffix: str, extra_image: bytes | None = None, doc=None) -> dict:
+    """
+    Estimate the peak memory (MB) and CPU share of processing one upload.
+
+    Pages are processed one at a time, so scanned PDFs are charged for their largest
+    single-page raster rather than the sum. Unreadable inputs get the base cost and fail
+    later with a proper error. `doc` is the already-open PDF, when the caller has one.
+    """
+    memory_mb, cpu = 0.0, 1.0
+    try:
+        if suffix == ".pdf":
+            memory_mb, cpu = _pdf_cost(content, doc)
+        elif suffix in (".png", ".jpg", ".jpeg"):
+            memory_mb = _image_pixels(content) * OCR_BYTES_PER_PIXEL / MB
+            cpu = OCR_CPU_COST
+        else:
+            memory_mb = len(content) * PARSE_BYTES_PER_FILE_BYTE / MB
+        if extra_image:
+            # Signature: decoded RGBA plus a PNG re-encode
+            memory_mb += _image_pixels(extra_image) * 8 / MB
+    except Exception:
+        memory_mb = len(content) * PARSE_BYTES_PER_FILE_BYTE / MB
+    return {"memory_mb": BASE_REQUEST_MB + memory_mb, "cpu": cpu}
+
+
+class AdmissionController:
+    """
+    Tracks the estimated cost of in-flight requests against CPU and memory budgets.
+
+    A request that doesn't fit waits (up to `queue_timeout` seconds, at most `max_queue`
+    waiters) for capacity to free up; otherwise it is rejected with 429 + Retry-After.
+    Waiters are admitted strictly in arrival order, so a large OCR job is not overtaken
+    indefinitely by a stream of small ones. A request larger than the whole budget is
+    still admitted when the node is idle.
+    """
+
+    def __init__(
+        self,
+        memory_budget_mb: float = ADMISSION_MEMORY_BUDGET_MB,
+        cpu_budget: float = ADMISSION_CPU_BUDGET,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+        retry_after: int = ADMISSION_RETRY_AFTER,
+    ):
+        self.memory_budget_mb = memory_budget_mb
+        self.cpu_budget = cpu_budget
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.memory_in_flight = 0.0
+        self.cpu_in_flight = 0.0
+        self.active = 0
+        # (cost, future) per waiting request, oldest first; the future is resolved once
+        # its cost has been reserved
+        self._queue = deque()
+
+    def _fits(self, cost: dict) -> bool:
+        if self.active == 0:
+            return True
+        return (
+            self.memory_in_flight + cost["memory_mb"] <= self.memory_budget_mb
+            and self.cpu_in_flight + cost["cpu"] <= self.cpu_budget
+        )
+
+    def _reject(self) -> HTTPException:
+        return HTTPException(
+            status_code=429,
+            detail="Server is busy processing other documents. Please retry shortly.",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    def _reserve(self, cost: dict) -> None:
+        self.active += 1
+        self.memory_in_flight += cost["memory_mb"]
+        self.cpu_in_flight += cost["cpu"]
+
+    def _release(self, cost: dict) -> None:
+        self.active -= 1
+        self.memory_in_flight -= cost["memory_mb"]
+        self.cpu_in_flight -= cost["cpu"]
+        self._wake()
+
+    def _wake(self) -> None:
+        # Admit waiters from the head of the queue until one doesn't fit
+        while self._queue and self._fits(self._queue[0][0]):
+            cost, waiter = self._queue.popleft()
+            self._reserve(cost)
+            waiter.set_result(None)
+
+    async def _wait_turn(self, cost: dict) -> None:
+        if len(self._queue) >= self.max_queue:
+            raise self._reject()
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (cost, waiter)
+        self._queue.append(entry)
+        try:
+            await asyncio.wait({waiter}, timeout=self.queue_timeout)
+        except BaseException:
+            if waiter.done():
+                # Cancelled after the slot was reserved: hand it back
+                self._release(cost)
+            else:
+                self._queue.remove(entry)
+                self._wake()
+            raise
+        if not waiter.done():
+            self._queue.remove(entry)
+            # Whoever was queued behind this request may fit now
+            self._wake()
+            raise self._reject()
+
+    @asynccontextmanager
+    async def admit(self, cost: dict):
+        requested = time.perf_counter()
+        if self._queue or not self._fits(cost):
+            await self._wait_turn(cost)
+        else:
+            self._reserve(cost)
+        add_stage("admission-wait", time.perf_counter() - requested)
+        try:
+            yield
+        finally:
+            self._release(cost)
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "waiting": len(self._queue),
+            "memory_in_flight_mb": round(self.memory_in_flight, 1),
+            "memory_budget_mb": self.memory_budget_mb,
+            "cpu_in_flight": self.cpu_in_flight,
+            "cpu_budget": self.cpu_budget,
+        }
+
+
+admission = AdmissionController()
@@ -1,14 +1,22 @@
-from .field_detector import detect_fields, normalize_fields
+from ..utils.text_cleaner import iter_cleaned_blocks
+from .field_detector import detect_fields, is_ignored, normalize_fields, scan_label_rules
 from .info_intent import classify_field, determine_required, map_risk_for_intent
 from .companion_steps import explain_step
 
+OVERVIEW_RULES = [
+    ("Application Form", ["application", "form", "apply"]),
+    ("Registration Form", ["registration", "register"]),
+    ("Declaration Form", ["declaration", "undertaking", "affidavit"]),
+]
+
+# Distinct lines remembered by ActionStepScanner; the memo restarts when full
+SEEN_LINES_LIMIT = 4096
+
 def infer_overview(text: str) -> str:
-    if any(k in text.lower() for k in ["application", "form", "apply"]):
-        return "Application Form"
-    if any(k in text.lower() for k in ["registration", "register"]):
-        return "Registration Form"
-    if any(k in text.lower() for k in ["declaration", "undertaking", "affidavit"]):
-        return "Declaration Form"
+    lower = text.lower()
+    for overview, keywords in OVERVIEW_RULES:
+        if any(k in lower for k in keywords):
+            return overview
     return "Document Analysis"
 
 def suggest_answer_for_field(field: str) -> str:
@@ -92,8 +100,59 @@ def generate_draft_for_field(field: str) -> str:
     return "Draft text — please review and edit before submitting."
 
 def extract_action_steps(text: str, context_questions: dict | None = None) -> dict:
-    overview = infer_overview(text)
-    fields = detect_fields(text)
+    return build_action_steps(infer_overview(text), detect_fields(text), context_questions)
+
+def extract_action_steps_from_raw(text: str, context_questions: dict | None = None) -> dict:
+    """Same result as `extract_action_steps(clean_text(text))`, in one pass over the text."""
+    scanner = ActionStepScanner()
+    for block in iter_cleaned_blocks(text):
+        scanner.scan(block)
+    return scanner.result(context_questions)
+
+class ActionStepScanner:
+    """
+    Field labels and the overview of cleaned text, gathered in one pass.
+
+    Fed the blocks of `iter_cleaned_blocks(text)` (or of a `BlockCleaner`), `result()`
+    equals `extract_action_steps(clean_text(text))`. The overview keywords and ignore
+    phrases are looked up once per block (neither can span a line), and repeated lines
+    (headers, footers, blank-form rows) are scanned once: a second scan can't add a field.
+    """
+
+    def __init__(self):
+        self.fields = set()
+        self._best = len(OVERVIEW_RULES)  # highest-priority overview rule seen so far
+        self._seen = set()
+
+    def scan(self, cleaned: str) -> None:
+        lower_text = cleaned.lower()
+        for i in range(self._best):
+            if any(k in lower_text for k in OVERVIEW_RULES[i][1]):
+                self._best = i
+                break
+        check_ignored = is_ignored(lower_text)
+
+        fields, seen = self.fields, self._seen
+        for line in cleaned.splitlines():
+            line = line.strip()
+            # scan_line's rules need a non-empty line under 140 chars
+            if not line or len(line) >= 140 or line in seen:
+                continue
+            if len(seen) >= SEEN_LINES_LIMIT:
+                seen.clear()
+            seen.add(line)
+            lower = line.lower()
+            if check_ignored and is_ignored(lower):
+                continue
+            scan_label_rules(line, lower, fields)
+
+    def overview(self) -> str:
+        return OVERVIEW_RULES[self._best][0] if self._best < len(OVERVIEW_RULES) else "Document Analysis"
+
+    def result(self, context_questions: dict | None = None) -> dict:
+        return build_action_steps(self.overview(), normalize_fields(list(self.fields)), context_questions)
+
+def build_action_steps(overview: str, fields: list[str], context_questions: dict | None = None) -> dict:
     grouped = {}
     for f in fields:
         intent = classify_field(f)
@@ -0,0 +1,175 @@
+import os
+import tempfile
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+from ..utils.profiling import note, stage
+from .ai_engine import extract_action_steps_from_raw
+from .layout_detector import attach_layout_positions
+from .pdf_parser import extract_from_docx, extract_from_image, extract_from_pdf
+from .streaming import analyze_pdf_streaming
+
+
+def extract_document(file_path: Path, ocr_languages=None, ocr_budget: float | None = None) -> dict:
+    with stage("extract"):
+        extracted = _extract_document(file_path, ocr_languages, ocr_budget)
+    note(extraction_method=extracted.get("method"))
+    return extracted
+
+
+def extract_pdf(doc: fitz.Document, ocr_languages=None, ocr_budget: float | None = None) -> dict:
+    """Extract from a PDF the caller has already opened (and will close)."""
+    with stage("extract"):
+        extracted = _extract_pdf(doc, ocr_languages, ocr_budget)
+    note(extraction_method=extracted.get("method"))
+    return extracted
+
+
+def _extract_pdf(doc: fitz.Document, ocr_languages=None, ocr_budget: float | None = None) -> dict:
+    # One handle for both: very large text-layer PDFs are analysed page by page, the
+    # streaming probe returns None for everything else
+    return analyze_pdf_streaming(doc) or extract_from_pdf(doc, ocr_languages, ocr_budget)
+
+
+def _extract_document(file_path: Path, ocr_languages=None, ocr_budget: float | None = None) -> dict:
+    suffix = file_path.suffix.lower()
+    if suffix in [".pdf"]:
+        with fitz.open(file_path) as doc:
+            return _extract_pdf(doc, ocr_languages, ocr_budget)
+    elif suffix in [".jpg", ".jpeg", ".png"]:
+        return extract_from_image(file_path, ocr_languages, ocr_budget)
+    elif suffix in [".docx"]:
+        return extract_from_docx(file_path)
+    raise ValueError("Unsupported file type")
+
+
+def open_pdf(content: bytes) -> fitz.Document:
+    return fitz.open(stream=content, filetype="pdf")
+
+
+def extract_bytes(content: bytes, suffix: str, ocr_languages=None, ocr_budget: float | None = None) -> dict:
+    if suffix == ".pdf":
+        # PDFs are read straight from memory
+        with open_pdf(content) as doc:
+            return extract_pdf(doc, ocr_languages, ocr_budget)
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        tmp.write(content)
+        tmp_path = Path(tmp.name)
+
+    # Now tmp is closed, safe to open and process
+    try:
+        return extract_document(tmp_path, ocr_languages, ocr_budget)
+    finally:
+        try:
+            os.unlink(tmp_path)
+        except Exception:
+            pass
+
+
+def _field_tip(field: dict) -> str:
+    if field.get("read_only"):
+        return "This field is filled in by the issuing office; leave it as it is."
+    if field.get("options"):
+        return "Choose one of the options listed on the form."
+    if field.get("type_name") == "checkbox":
+        return "Tick this box only if it applies to you."
+    if field.get("max_length"):
+        return f"Fill exactly as requested on the form (at most {field['max_length']} characters)."
+    return "Fill exactly as requested on the form."
+
+
+def _prefilled_value(field: dict) -> str:
+    # Text and choice fields may ship with a value; button states ("Yes"/"Off") are not answers
+    if field.get("type_name") not in ("text", "combobox", "listbox"):
+        return ""
+    return field.get("value") or field.get("default") or ""
+
+
+def build_analysis(extracted: dict) -> dict:
+    with stage("analysis"):
+        analysis = _build_analysis(extracted)
+    if extracted.get("ocr_coverage"):
+        # Which page regions OCR read before its deadline
+        analysis["ocr_coverage"] = extracted["ocr_coverage"]
+    if extracted.get("page_coverage"):
+        # How far the streamed text-layer scan got before an early stop
+        analysis["page_coverage"] = extracted["page_coverage"]
+    return analysis
+
+
+def is_complete(analysis: dict) -> bool:
+    # Results cut short by the OCR deadline or a streaming early stop are not final
+    return all(analysis.get(key, {}).get("complete", True) for key in ("ocr_coverage", "page_coverage"))
+
+
+def _build_analysis(extracted: dict) -> dict:
+    # Build the stable analysis schema used by the frontend (minus filename/saved_as)
+    if extracted.get("result") or extracted.get("text"):
+        if extracted.get("result"):
+            result = extracted["result"]
+        else:
+            result = extract_action_steps_from_raw(extracted.get("text", ""))
+        attach_layout_positions(result.get("steps", []), extracted.get("layout_fields"))
+        return {
+            "extraction_method": extracted.get("method"),
+            "action_overview": result.get("overview", "Document Analysis"),
+            "total_steps": result.get("total_steps", len(result.get("steps", []))),
+            "mandatory": result.get("mandatory", 0),
+            "optional": result.get("optional", 0),
+            "steps": result.get("steps", []),
+        }
+
+    if "fields" in extracted and extracted.get("fields"):
+        # Convert fillable field metadata into a single “fillable fields” step.
+        fields = []
+        for f in extracted.get("fields", []):
+            label = f.get("label") or f.get("name") or "Field"
+            field = {
+                "name": f.get("name"),
+                "label": label,
+                "tip": _field_tip(f),
+                "suggested_answer": _prefilled_value(f),
+            }
+            # Form-declared metadata, so the UI can offer real choices and limits
+            for key in ("type_name", "options", "option_values", "max_length", "required", "read_only"):
+                if f.get(key) is not None:
+                    field[key] = f[key]
+            if f.get("rect") is not None:
+                # Lets the preview highlight the widget
+                field["page"] = f.get("page")
+                field["rect"] = f["rect"]
+            fields.append(field)
+
+        steps = [
+            {
+                "id": 1,
+                "title": "Fillable Fields",
+                "required": True,
+                "risk": "medium",
+                "risk_reason": "These fields were detected from the PDF’s fillable form controls.",
+                "remediation_tip": "Review each field carefully before downloading the filled PDF.",
+                "what_to_do": "Fill the fields below.",
+                "fields": fields,
+                "companion": "Fill each field carefully. Use the guidance for format and common mistakes.",
+            }
+        ]
+
+        return {
+            "extraction_method": extracted.get("method"),
+            "action_overview": "Fillable fields detected",
+            "total_steps": 1,
+            "mandatory": 1,
+            "optional": 0,
+            "steps": steps,
+        }
+
+    return {
+        "extraction_method": extracted.get("method"),
+        "action_overview": "No fields detected",
+        "total_steps": 0,
+        "mandatory": 0,
+        "optional": 0,
+        "steps": [],
+    }
@@ -1,5 +1,16 @@
+import re
+import string
+import threading
+from collections import OrderedDict
+
+from backend.app.config import FIELD_GUIDE_CACHE_SIZE
 from backend.app.services.info_intent import classify_field
 
+# Leading numbering ("1.", "(a)", "ii)") and trailing markers (":", "*", "____")
+_LABEL_PREFIX = re.compile(r"^\s*(?:\(?[0-9]{1,3}[.)]|\(?[a-z]\)|\(?[ivx]{1,4}\))\s+", re.IGNORECASE)
+_LABEL_SUFFIX = re.compile(r"[\s:*_.\-–]+$")
+_SPACES = re.compile(r"\s+")
+
 
 def generate_companion_steps(fields: list[str]) -> list[dict]:
     grouped = {}
@@ -18,7 +29,7 @@ def generate_companion_steps(fields: list[str]) -> list[dict]:
             "title": intent,
             "why_this_step": get_reason(intent),
             "completion_tip": "Fill all fields carefully before moving to the next step.",
-            "fields": [build_field_guide(f) for f in intent_fields],
+            "fields": [field_guide(f) for f in intent_fields],
             "next_step_hint": "After completing this section, continue to the next one."
         })
         step_no += 1
@@ -26,6 +37,70 @@ def generate_companion_steps(fields: list[str]) -> list[dict]:
     return steps
 
 
+def normalize_label(label: str) -> str:
+    """Label as guides are built from: numbering, fill-in markers and extra spaces removed."""
+    label = _SPACES.sub(" ", label or "").strip()
+    label = _LABEL_SUFFIX.sub("", _LABEL_PREFIX.sub("", label))
+    return label
+
+
+class GuideCache:
+    """
+    Bounded LRU of field guides keyed by normalised label (case-insensitive).
+
+    Guides depend only on the label, so "Date of Birth:", "1. date of birth" and
+    "DATE OF BIRTH *" share one entry. It is built from the title-cased key
+    ("Date Of Birth"), so its text doesn't depend on which variant was seen first.
+    """
+
+    def __init__(self, max_entries: int = FIELD_GUIDE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._guides = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, label: str) -> dict:
+        normalized = normalize_label(label) or label.strip()
+        key = normalized.casefold()
+        with self._lock:
+            guide = self._guides.get(key)
+            if guide is not None:
+                self._guides.move_to_end(key)
+                self.hits += 1
+                return guide
+            self.misses += 1
+
+        canonical = string.capwords(key)
+        guide = {"intent": classify_field(canonical), **build_field_guide(canonical)}
+        with self._lock:
+            self._guides[key] = guide
+            while len(self._guides) > self.max_entries:
+                self._guides.popitem(last=False)
+        return guide
+
+
+guide_cache = GuideCache()
+
+
+def field_guide(label: str) -> dict:
+    # Cached guides are shared, so the caller's label is set on a copy
+    return {**guide_cache.get(label), "label": label}
+
+
+def step_guide(step: dict) -> dict:
+    """Guides for every field of an analysis step, in the shape of generate_companion_steps."""
+    title = step.get("title", "Section")
+    labels = [f.get("label") for f in step.get("fields", []) if f.get("label")]
+    return {
+        "step": step.get("id"),
+        "title": title,
+        "why_this_step": get_reason(title),
+        "completion_tip": "Fill all fields carefully before moving to the next step.",
+        "fields": [field_guide(label) for label in labels],
+    }
+
+
 # ---------------- HELPERS ---------------- #
 
 def build_field_guide(field: str) -> dict:
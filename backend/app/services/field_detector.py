@@ -1,4 +1,5 @@
 import re
+from typing import Iterable
 
 KEYWORDS = [
     "name", "first name", "last name", "middle name", "initial",
@@ -24,68 +25,131 @@ IGNORE_PHRASES = [
 
 
 def detect_fields(text: str) -> list[str]:
+    return detect_fields_from_lines(text.splitlines())
+
+
+def detect_fields_from_lines(lines: Iterable[str]) -> list[str]:
+    # Lines are consumed lazily, so callers can stream pages without joining them first
     fields = set()
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
-
-    def is_probably_value_line(line: str) -> bool:
-        lower = line.lower()
-        # OCR often merges label + value; if this looks like a value-heavy line, skip keyword detection.
-        if re.search(r"\b\d{3,}\b", line) and "_" not in line and not line.endswith(":"):
-            return True
-        if re.search(r"\b(rs|inr|usd|eur|gbp)\b", lower) and re.search(r"\d", line):
-            return True
-        # Too many digits relative to letters → likely a value/ID line, not a label
-        digits = sum(ch.isdigit() for ch in line)
-        letters = sum(ch.isalpha() for ch in line)
-        if digits >= 4 and letters > 0 and digits > letters:
-            return True
+    for line in lines:
+        scan_line(line, fields)
+    return normalize_fields(list(fields))
+
+
+_LONG_NUMBER = re.compile(r"\b\d{3,}\b")
+_CURRENCY = re.compile(r"\b(rs|inr|usd|eur|gbp)\b")
+_DIGIT = re.compile(r"\d")
+_TRAILING_NUMBER = re.compile(r"\b\d.*$")
+_NON_LABEL_CHARS = re.compile(r"[^A-Za-z0-9 /]")
+_MULTI_SPACE = re.compile(r"\s{2,}")
+# A label run followed by underscores. The lookahead/backreference pair makes the run
+# atomic: backing off a run can never reach "_" (only a space in the run is also \s and
+# more run chars follow it), so this matches exactly what the plain greedy run does,
+# without retrying every shorter length at every start position
+_UNDERLINED_LABEL = re.compile(r"([A-Za-z](?=([A-Za-z0-9 ,/()'\-]{1,50}))\2)\s*_+")
+
+
+def _prefix_tree_pattern(words: list[str]) -> str:
+    """
+    Regex matching wherever any of `words` occurs, with alternatives factored by shared
+    prefix ("a(?:ccount|ddress|ge)") so each position tries a handful of branches instead
+    of every word. A word that extends a shorter one is dropped: it can't add a match.
+    """
+    tree = {}
+    for word in words:
+        node = tree
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def branch(node: dict) -> str:
+        if "" in node:
+            return ""
+        alternatives = [re.escape(ch) + branch(child) for ch, child in sorted(node.items())]
+        return alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+
+    return branch(tree)
+
+
+# Substring match for any keyword (same as `any(kw in lower for kw in KEYWORDS)`)
+_ANY_KEYWORD = re.compile(_prefix_tree_pattern(KEYWORDS))
+
+
+def is_probably_value_line(line: str) -> bool:
+    # Every rule below needs at least one digit
+    if not _DIGIT.search(line):
         return False
+    lower = line.lower()
+    # OCR often merges label + value; if this looks like a value-heavy line, skip keyword detection.
+    if _LONG_NUMBER.search(line) and "_" not in line and not line.endswith(":"):
+        return True
+    if _CURRENCY.search(lower) and _DIGIT.search(line):
+        return True
+    # Too many digits relative to letters → likely a value/ID line, not a label
+    digits = sum(map(str.isdigit, line))
+    letters = sum(map(str.isalpha, line))
+    if digits >= 4 and letters > 0 and digits > letters:
+        return True
+    return False
 
-    def clean_label_candidate(s: str) -> str:
-        # Take only the label portion (before values) and normalize
-        s = s.strip()
-        if ":" in s:
-            s = s.split(":", 1)[0]
-        # Remove trailing numbers / amount fragments
-        s = re.sub(r"\b\d.*$", "", s).strip()
-        s = re.sub(r"[^A-Za-z0-9 /]", "", s).strip()
-        s = re.sub(r"\s{2,}", " ", s).strip()
-        return s
 
-    for line in lines:
-        lower = line.lower()
+def clean_label_candidate(s: str) -> str:
+    # Take only the label portion (before values) and normalize
+    s = s.strip()
+    if ":" in s:
+        s = s.split(":", 1)[0]
+    # Remove trailing numbers / amount fragments
+    s = _TRAILING_NUMBER.sub("", s).strip()
+    s = _NON_LABEL_CHARS.sub("", s).strip()
+    s = _MULTI_SPACE.sub(" ", s).strip()
+    return s
+
+
+def scan_line(line: str, fields: set) -> None:
+    line = line.strip()
+    # Every rule below needs a non-empty line shorter than 140 chars
+    if not line or len(line) >= 140:
+        return
+    lower = line.lower()
+    if is_ignored(lower):
+        return
+    scan_label_rules(line, lower, fields)
+
 
-        if any(p in lower for p in IGNORE_PHRASES):
-            continue
+def is_ignored(lower: str) -> bool:
+    return any(p in lower for p in IGNORE_PHRASES)
 
-        # Label-like lines
-        if line.endswith(":") and len(line) < 60:
-            candidate = clean_label_candidate(line.rstrip(":"))
+
+def scan_label_rules(line: str, lower: str, fields: set) -> None:
+    # The rules of scan_line, for a stripped line under 140 chars that isn't ignored
+
+    # Label-like lines
+    if line.endswith(":") and len(line) < 60:
+        candidate = clean_label_candidate(line.rstrip(":"))
+        if 2 <= len(candidate) <= 60:
+            fields.add(candidate)
+
+    # Common form layout: labels followed by underline blanks (____)
+    if "_" in line and len(line) < 140:
+        for m in _UNDERLINED_LABEL.finditer(line):
+            candidate = m.group(1).strip().strip(",")
+            candidate = clean_label_candidate(candidate)
             if 2 <= len(candidate) <= 60:
                 fields.add(candidate)
 
-        # Common form layout: labels followed by underline blanks (____)
-        if "_" in line and len(line) < 140:
-            for m in re.finditer(r"([A-Za-z][A-Za-z0-9 ,/()'\-]{1,50})\s*_+", line):
-                candidate = m.group(1).strip().strip(",")
-                candidate = clean_label_candidate(candidate)
-                if 2 <= len(candidate) <= 60:
-                    fields.add(candidate)
-
-        # Keyword-based detection
-        if not is_probably_value_line(line):
-            for kw in KEYWORDS:
-                if kw in lower and len(line) < 120:
-                    candidate = clean_label_candidate(line)
-                    if 2 <= len(candidate) <= 60:
-                        fields.add(candidate)
-
-    return normalize_fields(list(fields))
+    # Keyword-based detection (the candidate is the whole line, so one keyword hit suffices)
+    if len(line) < 120 and _ANY_KEYWORD.search(lower) and not is_probably_value_line(line):
+        candidate = clean_label_candidate(line)
+        if 2 <= len(candidate) <= 60:
+            fields.add(candidate)
 
 
 def normalize_fields(fields: list[str]) -> list[str]:
     final = []
+    final_lower = []
     for field in sorted(fields, key=len, reverse=True):
-        if not any(field.lower() in f.lower() for f in final):
+        lower = field.lower()
+        if not any(lower in f for f in final_lower):
             final.append(field)
+            final_lower.append(lower)
     return sorted(final)
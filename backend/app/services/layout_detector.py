@@ -0,0 +1,238 @@
+import re
+from collections import defaultdict
+
+from .field_detector import (
+    IGNORE_PHRASES,
+    KEYWORDS,
+    clean_label_candidate,
+    is_probably_value_line,
+)
+
+# Grid cell size (PDF points) for the spatial index
+GRID_CELL = 64.0
+
+# Geometry thresholds (PDF points)
+MIN_UNDERLINE_WIDTH = 30.0
+MAX_LINE_THICKNESS = 1.5
+MIN_BOX_WIDTH = 10.0
+MIN_BOX_HEIGHT = 8.0
+MAX_BOX_HEIGHT = 60.0
+UNDERLINE_AREA_HEIGHT = 12.0
+
+# How far a label may be from its input region
+MAX_RIGHT_DISTANCE = 220.0
+MAX_BELOW_DISTANCE = 40.0
+ROW_TOLERANCE = 4.0
+BELOW_ALIGN_TOLERANCE = 24.0
+
+UNDERSCORE_RUN = re.compile(r"_{3,}")
+
+
+class SpatialGrid:
+    """Uniform grid over page coordinates; each item is stored in every cell its rect touches."""
+
+    def __init__(self, cell: float = GRID_CELL):
+        self.cell = cell
+        self.cells = defaultdict(list)
+
+    def _cell_range(self, rect):
+        x0, y0, x1, y1 = rect
+        c = self.cell
+        return range(int(x0 // c), int(x1 // c) + 1), range(int(y0 // c), int(y1 // c) + 1)
+
+    def insert(self, rect, item) -> None:
+        xs, ys = self._cell_range(rect)
+        for cx in xs:
+            for cy in ys:
+                self.cells[(cx, cy)].append(item)
+
+    def query(self, rect) -> set:
+        xs, ys = self._cell_range(rect)
+        found = set()
+        for cx in xs:
+            for cy in ys:
+                found.update(self.cells.get((cx, cy), ()))
+        return found
+
+
+def is_label_like(text: str) -> bool:
+    lower = text.lower()
+    if len(text) >= 120 or any(p in lower for p in IGNORE_PHRASES):
+        return False
+    if text.endswith(":"):
+        return True
+    if is_probably_value_line(text):
+        return False
+    return any(kw in lower for kw in KEYWORDS)
+
+
+def _line_chars(line: dict) -> tuple[str, list[float], float, float]:
+    # Flatten spans into text plus an approximate x position per character
+    text = ""
+    xs = []
+    xs_end = 0.0
+    y0 = min(s["bbox"][1] for s in line["spans"])
+    y1 = max(s["bbox"][3] for s in line["spans"])
+    for span in line["spans"]:
+        t = span["text"]
+        if not t:
+            continue
+        sx0, _, sx1, _ = span["bbox"]
+        step = (sx1 - sx0) / len(t)
+        for i in range(len(t)):
+            xs.append(sx0 + i * step)
+        xs_end = sx1
+        text += t
+    xs.append(xs_end)
+    return text, xs, y0, y1
+
+
+def _drawn_regions(page) -> list[dict]:
+    regions = []
+    page_width = page.rect.width
+    for path in page.get_drawings():
+        for item in path.get("items", []):
+            kind = item[0]
+            if kind == "l":
+                p1, p2 = item[1], item[2]
+                if abs(p1.y - p2.y) <= MAX_LINE_THICKNESS and abs(p1.x - p2.x) >= MIN_UNDERLINE_WIDTH:
+                    y = max(p1.y, p2.y)
+                    regions.append({
+                        "rect": (min(p1.x, p2.x), y - UNDERLINE_AREA_HEIGHT, max(p1.x, p2.x), y),
+                        "kind": "underline",
+                    })
+            elif kind == "re":
+                r = item[1]
+                if r.height <= MAX_LINE_THICKNESS and r.width >= MIN_UNDERLINE_WIDTH:
+                    # Thin filled rectangles are commonly used as rules
+                    regions.append({
+                        "rect": (r.x0, r.y1 - UNDERLINE_AREA_HEIGHT, r.x1, r.y1),
+                        "kind": "underline",
+                    })
+                elif (
+                    r.width >= MIN_BOX_WIDTH
+                    and MIN_BOX_HEIGHT <= r.height <= MAX_BOX_HEIGHT
+                    and r.width < 0.9 * page_width
+                ):
+                    regions.append({"rect": (r.x0, r.y0, r.x1, r.y1), "kind": "box"})
+    return regions
+
+
+def _link_distance(label_rect, region_rect) -> float | None:
+    lx0, ly0, lx1, ly1 = label_rect
+    rx0, ry0, rx1, ry1 = region_rect
+    # Input area to the right on the same row
+    if rx1 > lx1 and rx0 >= lx1 - ROW_TOLERANCE and ry0 < ly1 + ROW_TOLERANCE and ry1 > ly0 - ROW_TOLERANCE:
+        gap = max(0.0, rx0 - lx1)
+        if gap <= MAX_RIGHT_DISTANCE:
+            return gap
+    # Input area directly below, left-aligned with the label
+    if ry0 >= ly1 - ROW_TOLERANCE and abs(rx0 - lx0) <= BELOW_ALIGN_TOLERANCE and rx1 > lx0:
+        gap = max(0.0, ry0 - ly1)
+        if gap <= MAX_BELOW_DISTANCE:
+            return gap * 1.5
+    return None
+
+
+def detect_page_layout_fields(page, page_index: int = 0) -> list[dict]:
+    """
+    Detect positioned fields on one page of a flat (non-AcroForm) PDF.
+
+    Input regions come from underscore runs in the text plus drawn underlines and boxes.
+    Labels sitting right before an underscore run are linked directly; the remaining
+    label-like lines are matched to their nearest free region through a SpatialGrid.
+    """
+    fields = []
+    labels = []
+    regions = _drawn_regions(page)
+
+    for block in page.get_text("dict").get("blocks", []):
+        for line in block.get("lines", []):
+            if not line.get("spans"):
+                continue
+            text, xs, y0, y1 = _line_chars(line)
+            if not text.strip():
+                continue
+
+            pos = 0
+            for m in UNDERSCORE_RUN.finditer(text):
+                label = clean_label_candidate(text[pos:m.start()].strip().strip(","))
+                run_rect = (xs[m.start()], y0, xs[m.end()], y1)
+                if 2 <= len(label) <= 60:
+                    fields.append({
+                        "label": label,
+                        "page": page_index,
+                        "rect": [round(v, 2) for v in run_rect],
+                        "label_rect": [round(v, 2) for v in (xs[pos], y0, xs[m.start()], y1)],
+                        "kind": "underscore",
+                    })
+                else:
+                    regions.append({"rect": run_rect, "kind": "underscore"})
+                pos = m.end()
+
+            rest = text[pos:].strip()
+            if rest and is_label_like(rest):
+                label = clean_label_candidate(rest.rstrip(":"))
+                if 2 <= len(label) <= 60:
+                    labels.append({"label": label, "rect": (xs[pos], y0, xs[-1], y1)})
+
+    if labels and regions:
+        grid = SpatialGrid()
+        for idx, region in enumerate(regions):
+            grid.insert(region["rect"], idx)
+
+        pairs = []
+        for li, lab in enumerate(labels):
+            lx0, ly0, lx1, ly1 = lab["rect"]
+            window = (lx0, ly0 - ROW_TOLERANCE, lx1 + MAX_RIGHT_DISTANCE, ly1 + MAX_BELOW_DISTANCE)
+            for ri in grid.query(window):
+                dist = _link_distance(lab["rect"], regions[ri]["rect"])
+                if dist is not None:
+                    pairs.append((dist, li, ri))
+
+        # Greedy one-to-one assignment, closest pairs first
+        used_labels, used_regions = set(), set()
+        for dist, li, ri in sorted(pairs):
+            if li in used_labels or ri in used_regions:
+                continue
+            used_labels.add(li)
+            used_regions.add(ri)
+            fields.append({
+                "label": labels[li]["label"],
+                "page": page_index,
+                "rect": [round(v, 2) for v in regions[ri]["rect"]],
+                "label_rect": [round(v, 2) for v in labels[li]["rect"]],
+                "kind": regions[ri]["kind"],
+            })
+
+    return fields
+
+
+def detect_layout_fields(doc, max_pages: int | None = None) -> list[dict]:
+    page_count = len(doc) if max_pages is None else min(len(doc), max_pages)
+    fields = []
+    seen = set()
+    for page_index in range(page_count):
+        for f in detect_page_layout_fields(doc.load_page(page_index), page_index):
+            key = (f["page"], f["label"].lower())
+            if key in seen:
+                continue
+            seen.add(key)
+            fields.append(f)
+    return fields
+
+
+def attach_layout_positions(steps: list[dict], layout_fields: list[dict] | None) -> list[dict]:
+    # Give step fields the position of the first layout field with the same label
+    if not layout_fields:
+        return steps
+    by_label = {}
+    for f in layout_fields:
+        by_label.setdefault(f["label"].lower(), f)
+    for step in steps:
+        for field in step.get("fields", []):
+            match = by_label.get(str(field.get("label", "")).lower())
+            if match:
+                field["page"] = match["page"]
+                field["rect"] = match["rect"]
+    return steps
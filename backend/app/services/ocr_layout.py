@@ -0,0 +1,57 @@
+import numpy as np
+
+# Fragments whose vertical centres are closer than this (x median height) share a row
+ROW_MERGE_RATIO = 0.5
+# A horizontal gap wider than this (x median height) starts a new column segment
+COLUMN_GAP_RATIO = 2.5
+
+
+def reconstruct_lines(result: list) -> list[str]:
+    """
+    Rebuild reading-order text lines from EasyOCR `readtext` output.
+
+    `result` is a list of (box, text, confidence) where box is four (x, y) corners.
+    Fragments are binned into rows by their vertical centre, sorted left to right,
+    and joined with a space; a large horizontal gap splits a row into separate
+    column segments so side-by-side labels don't run together.
+    """
+    if not result:
+        return []
+
+    texts = np.array([str(t).strip() for (_, t, _) in result], dtype=object)
+    conf = np.fromiter((c for (_, _, c) in result), dtype=np.float64, count=len(result))
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+
+    # Same confidence rule as before: keep confident fragments and short ones
+    keep = ((conf > 0.5) | (lengths < 40)) & (lengths > 0)
+    if not keep.any():
+        return []
+
+    boxes = np.asarray([b for (b, _, _) in result], dtype=np.float64)[keep]  # (n, 4, 2)
+    texts = texts[keep]
+
+    x0 = boxes[:, :, 0].min(axis=1)
+    x1 = boxes[:, :, 0].max(axis=1)
+    y0 = boxes[:, :, 1].min(axis=1)
+    y1 = boxes[:, :, 1].max(axis=1)
+    yc = (y0 + y1) / 2.0
+    height = max(float(np.median(y1 - y0)), 1.0)
+
+    # Row binning: sort by vertical centre, start a new row on a large jump
+    order = np.argsort(yc, kind="stable")
+    row_breaks = np.diff(yc[order]) > ROW_MERGE_RATIO * height
+    row_of = np.empty(len(order), dtype=np.int64)
+    row_of[order] = np.concatenate(([0], np.cumsum(row_breaks)))
+
+    # Reading order: row first, then x
+    order = np.lexsort((x0, row_of))
+    rows = row_of[order]
+    gaps = x0[order][1:] - x1[order][:-1]
+
+    # A new segment starts at every row change or wide gap inside a row
+    new_segment = np.concatenate(([True], (rows[1:] != rows[:-1]) | (gaps > COLUMN_GAP_RATIO * height)))
+    starts = np.flatnonzero(new_segment)
+    ends = np.append(starts[1:], len(order))
+
+    ordered_texts = texts[order]
+    return [" ".join(ordered_texts[s:e]) for s, e in zip(starts, ends)]
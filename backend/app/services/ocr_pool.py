@@ -0,0 +1,166 @@
+import gc
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from ..config import OCR_MEMORY_BUDGET_MB, OCR_READER_ESTIMATE_MB, OCR_READER_IDLE_SECONDS
+from ..utils.helpers import current_rss_bytes
+
+# EasyOCR language sets that can share one reader (same recognition model family)
+SCRIPT_LANGUAGES = {
+    "latin": ("en",),
+    "devanagari": ("en", "hi", "mr"),
+    "tamil": ("en", "ta"),
+}
+
+# Unicode block of each non-Latin script, used to tell its glyphs apart from English
+SCRIPT_GLYPHS = {
+    "devanagari": ("\u0900", "\u097f"),
+    "tamil": ("\u0b80", "\u0bff"),
+}
+
+SUPPORTED_LANGUAGES = {lang for langs in SCRIPT_LANGUAGES.values() for lang in langs}
+
+# Pages where no other script is detected are read in English
+DEFAULT_LANGUAGES = SCRIPT_LANGUAGES["latin"]
+
+
+def normalize_languages(languages) -> tuple[str, ...]:
+    """Map a requested language list onto the reader set that covers it."""
+    requested = {lang.strip().lower() for lang in languages if lang and lang.strip()}
+    unknown = requested - SUPPORTED_LANGUAGES
+    if unknown:
+        raise ValueError(f"Unsupported OCR language(s): {', '.join(sorted(unknown))}")
+    for langs in SCRIPT_LANGUAGES.values():
+        if requested <= set(langs):
+            return langs
+    raise ValueError("These languages cannot be recognised together: " + ", ".join(sorted(requested)))
+
+
+def _load_easyocr_reader(languages: tuple[str, ...]):
+    # Import here to avoid importing torch/easyocr at process start
+    import easyocr  # type: ignore
+    return easyocr.Reader(list(languages), gpu=False)
+
+
+class ReaderPool:
+    """
+    Lazily loaded EasyOCR readers keyed by language set.
+
+    Each reader's resident cost is measured when it loads (RSS delta, falling back to
+    OCR_READER_ESTIMATE_MB). Before a new reader is loaded, least-recently-used readers
+    that are not in use are evicted until the new one fits in the memory budget. Readers
+    idle for longer than `idle_seconds` are dropped on the next acquire.
+    """
+
+    def __init__(
+        self,
+        budget_mb: int = OCR_MEMORY_BUDGET_MB,
+        idle_seconds: int = OCR_READER_IDLE_SECONDS,
+        loader=_load_easyocr_reader,
+    ):
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self.idle_seconds = idle_seconds
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # languages -> {"reader", "bytes", "in_use", "last_used"}
+
+    def _resident_bytes(self) -> int:
+        return sum(e["bytes"] for e in self._entries.values())
+
+    def _evict(self, key) -> None:
+        self._entries.pop(key, None)
+        logging.info("Evicted OCR reader %s", ",".join(key))
+
+    def _evict_idle(self, now: float) -> None:
+        for key, entry in list(self._entries.items()):
+            if entry["in_use"] == 0 and now - entry["last_used"] > self.idle_seconds:
+                self._evict(key)
+
+    def _make_room(self, needed: int) -> None:
+        for key, entry in list(self._entries.items()):
+            if self._resident_bytes() + needed <= self.budget_bytes:
+                return
+            if entry["in_use"] == 0:
+                self._evict(key)
+        if self._resident_bytes() + needed > self.budget_bytes:
+            logging.warning("OCR reader pool is over its memory budget; all resident readers are busy")
+
+    def _acquire(self, key):
+        # Reserve the slot under the lock; the model itself loads outside it so requests
+        # for readers that are already resident never wait behind a cold load
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._entries.get(key)
+            loading = entry is None
+            if loading:
+                estimate = OCR_READER_ESTIMATE_MB * 1024 * 1024
+                self._make_room(estimate)
+                entry = {"reader": None, "bytes": estimate, "in_use": 0, "ready": threading.Event(), "error": None}
+                self._entries[key] = entry
+            entry["in_use"] += 1
+            self._entries.move_to_end(key)
+            entry["last_used"] = now
+
+        if loading:
+            try:
+                gc.collect()
+                before = current_rss_bytes()
+                reader = self.loader(key)
+                measured = current_rss_bytes() - before
+            except BaseException as e:
+                with self._lock:
+                    entry["error"] = e
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+                entry["ready"].set()
+                self._release(entry)
+                raise
+            with self._lock:
+                entry["reader"] = reader
+                if measured > 0:
+                    entry["bytes"] = measured
+            entry["ready"].set()
+        else:
+            # Another request is loading this reader: wait for it without the pool lock
+            entry["ready"].wait()
+            if entry["error"] is not None:
+                self._release(entry)
+                raise RuntimeError(f"OCR reader {','.join(key)} failed to load") from entry["error"]
+        return entry
+
+    def _release(self, entry) -> None:
+        with self._lock:
+            entry["in_use"] -= 1
+            entry["last_used"] = time.monotonic()
+
+    def get(self, languages=("en",)):
+        """Return a reader without holding it; prefer `reader()` so eviction can see it is busy."""
+        entry = self._acquire(normalize_languages(languages))
+        self._release(entry)
+        return entry["reader"]
+
+    @contextmanager
+    def reader(self, languages=("en",)):
+        entry = self._acquire(normalize_languages(languages))
+        try:
+            yield entry["reader"]
+        finally:
+            self._release(entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "budget_mb": self.budget_bytes // (1024 * 1024),
+                "resident_mb": self._resident_bytes() // (1024 * 1024),
+                "readers": [
+                    {"languages": list(k), "mb": e["bytes"] // (1024 * 1024), "in_use": e["in_use"]}
+                    for k, e in self._entries.items()
+                ],
+            }
+
+
+reader_pool = ReaderPool()
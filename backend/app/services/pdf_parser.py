@@ -1,26 +1,30 @@
 from pathlib import Path
+from typing import Iterator
 import fitz  # PyMuPDF
-import io
 import numpy as np
+import time
 from PIL import Image
 from docx import Document
 
-_ocr_reader = None
-
-def get_ocr_reader():
-    global _ocr_reader
-    if _ocr_reader is None:
-        # Import here to avoid importing torch/easyocr at process start
-        import easyocr  # type: ignore
-        _ocr_reader = easyocr.Reader(["en"], gpu=False)
-    return _ocr_reader
-
+from ..config import (
+    LAYOUT_DETECTION,
+    LAYOUT_MAX_PAGES,
+    OCR_MAX_PAGES,
+    OCR_REGION_HEIGHT_PT,
+    OCR_RENDER_DPI,
+    OCR_TIME_BUDGET_SECONDS,
+)
+from ..utils.profiling import note, stage
+from .acroform import extract_form_fields
+from .layout_detector import detect_layout_fields
+from .progressive_ocr import progressive_ocr
 
 def extract_text_from_document(file_path: Path) -> dict:
     ext = file_path.suffix.lower()
 
     if ext == ".pdf":
-        return extract_from_pdf(file_path)
+        with fitz.open(file_path) as doc:
+            return extract_from_pdf(doc)
 
     if ext in {".png", ".jpg", ".jpeg"}:
         return extract_from_image(file_path)
@@ -34,88 +38,97 @@ def extract_text_from_document(file_path: Path) -> dict:
 # ---------- PDF ----------
 
 
-def extract_from_pdf(pdf_path: Path) -> dict:
-    import fitz
-    text_blocks = []
-    fillable_fields = []
-    doc = fitz.open(pdf_path)
-    try:
-        # Try to extract AcroForm fields (fillable fields)
-        for page in doc:
-            widgets = page.widgets()
-            if widgets:
-                for w in widgets:
-                    if w.field_name:
-                        fillable_fields.append({
-                            "name": w.field_name,
-                            "type": w.field_type,
-                            "label": w.field_label or w.field_name,
-                            "rect": list(w.rect),
-                        })
-        # If no widgets, fallback to text extraction
-        if not fillable_fields:
-            for page in doc:
-                text = page.get_text().strip()
-                if text:
-                    text_blocks.append(text)
-    finally:
-        doc.close()
+def iter_page_texts(doc, max_pages: int | None = None) -> Iterator[tuple[int, str]]:
+    # Yield (page_index, text) one page at a time so callers never hold the whole document text
+    page_count = len(doc) if max_pages is None else min(len(doc), max_pages)
+    for page_index in range(page_count):
+        page = doc.load_page(page_index)
+        text = page.get_text()
+        page = None
+        yield page_index, text
 
+
+def extract_from_pdf(doc: fitz.Document, languages=None, ocr_budget: float | None = None) -> dict:
+    # `doc` is opened (and closed) by the caller, so one handle serves every stage.
+    # The OCR time budget counts from the start of extraction
+    deadline = time.monotonic() + (ocr_budget or OCR_TIME_BUDGET_SECONDS)
+    text_blocks = []
+    note(page_count=len(doc))
+    # Try to extract AcroForm fields (fillable fields) from the field tree
+    with stage("acroform"):
+        fillable_fields = extract_form_fields(doc)
+    note(form_fields=len(fillable_fields))
     if fillable_fields:
         return {
             "fields": fillable_fields,
             "method": "acroform"
         }
-    elif text_blocks:
-        return {
+
+    # If no widgets, fallback to text extraction
+    with stage("text-layer"):
+        for _, text in iter_page_texts(doc):
+            text = text.strip()
+            if text:
+                text_blocks.append(text)
+    if text_blocks:
+        extracted = {
             "text": "\n".join(text_blocks),
             "method": "text-layer"
         }
-
-    # OCR fallback
-    ocr_text = []
-    doc = fitz.open(pdf_path)
-    try:
-        max_pages = min(len(doc), 2 if len(doc) > 5 else 3)
-        for page_index in range(max_pages):
-            page = doc[page_index]
-            pix = page.get_pixmap(dpi=120)
-            img_bytes = pix.tobytes("png")
-            img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-            try:
-                img_np = np.array(img)
-                result = get_ocr_reader().readtext(img_np)
-                for (_, text, conf) in result:
-                    if conf > 0.5 or len(text) < 40:
-                        ocr_text.append(text.strip())
-                if len(" ".join(ocr_text)) > 1500:
-                    break
-            finally:
-                img.close()
-    finally:
-        doc.close()
+        if LAYOUT_DETECTION:
+            # Flat PDFs: position labels against drawn boxes/underlines for later filling
+            with stage("layout"):
+                extracted["layout_fields"] = detect_layout_fields(doc, LAYOUT_MAX_PAGES)
+        return extracted
+
+    # OCR fallback (same open document): rasterise pages while time
+    # remains, then recognise their most label-dense regions first until the deadline
+    pages = []
+    for page_index in range(min(len(doc), OCR_MAX_PAGES)):
+        if time.monotonic() >= deadline:
+            break
+        page = doc[page_index]
+        with stage("ocr-render"):
+            pix = page.get_pixmap(dpi=OCR_RENDER_DPI, colorspace=fitz.csGRAY, alpha=False)
+            gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+            pix = None
+        pages.append({
+            "index": page_index,
+            "gray": gray,
+            "languages": languages,  # None: detected per page
+            "scale": 72.0 / OCR_RENDER_DPI,
+            "band_px": int(OCR_REGION_HEIGHT_PT * OCR_RENDER_DPI / 72.0),
+        })
+    total_pages = len(doc)
+
+    lines, coverage = progressive_ocr(pages, deadline)
+    coverage["total_pages"] = total_pages
+    coverage["complete"] = coverage["complete"] and len(pages) == total_pages
     return {
-        "text": "\n".join(ocr_text),
-        "method": "ocr-pdf"
+        "text": "\n".join(lines),
+        "method": "ocr-pdf",
+        "ocr_coverage": coverage,
     }
 
 
 # ---------- IMAGE ----------
 
-def extract_from_image(image_path: Path) -> dict:
-    img = Image.open(image_path).convert("RGB")
-    img_np = np.array(img)
+def extract_from_image(image_path: Path, languages=None, ocr_budget: float | None = None) -> dict:
+    deadline = time.monotonic() + (ocr_budget or OCR_TIME_BUDGET_SECONDS)
+    with Image.open(image_path) as img:
+        gray = np.array(img.convert("L"))
 
-    result = get_ocr_reader().readtext(img_np)
-    text_blocks = []
-
-    for (_, text, conf) in result:
-        if conf > 0.5 or len(text) < 40:
-            text_blocks.append(text.strip())
+    # Regions are recognised by priority until the deadline; fragments are then
+    # reassembled into label lines using their bounding boxes
+    lines, coverage = progressive_ocr(
+        [{"index": 0, "gray": gray, "languages": languages, "scale": 1.0}], deadline
+    )
+    coverage["total_pages"] = 1
 
     return {
-        "text": "\n".join(text_blocks),
-        "method": "ocr-image"
+        "text": "\n".join(lines),
+        "method": "ocr-image",
+        "ocr_coverage": coverage,
     }
 
 
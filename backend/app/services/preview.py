@@ -0,0 +1,190 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+from ..utils.profiling import stage
+from ..config import (
+    PREVIEW_CACHE_DIR,
+    PREVIEW_DISK_CACHE_MB,
+    PREVIEW_MEMORY_CACHE_MB,
+    PREVIEW_TILE_SIZE,
+)
+
+# Bump when rendering output changes so stale ETags and disk tiles stop matching
+RENDER_VERSION = 1
+
+HIGHLIGHT_COLOR = (0.15, 0.45, 0.95)
+HIGHLIGHT_OPACITY = 0.18
+
+# Rendering one tile: a small raster plus the parsed page
+TILE_RENDER_COST = {"memory_mb": 40.0, "cpu": 1.0}
+
+# The disk tier is pruned back to its size limit every this many writes (per process)
+PRUNE_EVERY = 64
+MB = 1024 * 1024
+
+
+def read_page_sizes(pdf_bytes: bytes) -> list[tuple[float, float]]:
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        return [(page.rect.width, page.rect.height) for page in doc]
+    finally:
+        doc.close()
+
+
+def tile_grid(page_size: tuple[float, float], zoom: float, tile_size: int = PREVIEW_TILE_SIZE) -> tuple[int, int]:
+    # (columns, rows) of tiles covering the page at this zoom
+    width, height = page_size
+    return max(1, math.ceil(width * zoom / tile_size)), max(1, math.ceil(height * zoom / tile_size))
+
+
+def tile_etag(doc_hash: str, page_index: int, zoom: float, col: int, row: int, rects: list,
+              tile_size: int = PREVIEW_TILE_SIZE) -> str:
+    """
+    Strong ETag for a tile, derived from everything that determines its pixels.
+
+    Computed without rendering, so conditional requests are answered from the key alone.
+    """
+    overlay = json.dumps([[round(v, 2) for v in r] for r in rects])
+    key = f"{RENDER_VERSION}:{doc_hash}:{page_index}:{zoom}:{col}:{row}:{tile_size}:{overlay}"
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:40] + '"'
+
+
+def render_tile(pdf_bytes: bytes, page_index: int, zoom: float, col: int, row: int, rects: list,
+                tile_size: int = PREVIEW_TILE_SIZE) -> bytes:
+    """Render one PNG tile of a page at `zoom`, with field rects highlighted."""
+    with stage("render-tile"):
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        try:
+            page = doc.load_page(page_index)
+            # The document is a throwaway copy, so overlays are drawn straight onto the page
+            for r in rects:
+                page.draw_rect(fitz.Rect(r), color=HIGHLIGHT_COLOR, fill=HIGHLIGHT_COLOR,
+                               fill_opacity=HIGHLIGHT_OPACITY, width=0.8)
+            step = tile_size / zoom
+            x0 = page.rect.x0 + col * step
+            y0 = page.rect.y0 + row * step
+            clip = fitz.Rect(x0, y0, x0 + step, y0 + step) & page.rect
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, alpha=False)
+            return pix.tobytes("png")
+        finally:
+            doc.close()
+
+
+def field_rects(steps: list[dict], page_index: int) -> list:
+    # Field positions come from the analysis (AcroForm widgets or layout detection)
+    rects = []
+    for step in steps:
+        for field in step.get("fields", []):
+            if field.get("page") == page_index and field.get("rect"):
+                rects.append(list(field["rect"]))
+    return rects
+
+
+class PreviewCache:
+    """
+    Rendered tiles, keyed by ETag: an in-process LRU in front of a shared disk directory.
+
+    The disk tier is shared by all workers on the node; writes go through a temporary
+    file and a rename so readers never see partial tiles. Page sizes are memoised per
+    document so tile requests can be validated without reopening the PDF.
+    """
+
+    def __init__(self, directory=PREVIEW_CACHE_DIR, memory_mb: int = PREVIEW_MEMORY_CACHE_MB,
+                 disk_mb: int = PREVIEW_DISK_CACHE_MB):
+        self.directory = Path(directory)
+        self.max_memory_bytes = memory_mb * MB
+        self.max_disk_bytes = disk_mb * MB
+        self._lock = threading.Lock()
+        self._tiles = OrderedDict()
+        self._memory_bytes = 0
+        self._pages = OrderedDict()  # doc hash -> [(width, height), ...]
+        self._writes = 0
+
+    def _path(self, etag: str) -> Path:
+        return self.directory / (etag.strip('"') + ".png")
+
+    def _remember(self, etag: str, png: bytes) -> None:
+        with self._lock:
+            if etag in self._tiles:
+                self._tiles.move_to_end(etag)
+                return
+            self._tiles[etag] = png
+            self._memory_bytes += len(png)
+            while self._tiles and self._memory_bytes > self.max_memory_bytes:
+                _, old = self._tiles.popitem(last=False)
+                self._memory_bytes -= len(old)
+
+    def get(self, etag: str) -> bytes | None:
+        with self._lock:
+            png = self._tiles.get(etag)
+            if png is not None:
+                self._tiles.move_to_end(etag)
+                return png
+        path = self._path(etag)
+        try:
+            png = path.read_bytes()
+            os.utime(path)  # disk pruning evicts least recently used first
+        except OSError:
+            return None
+        self._remember(etag, png)
+        return png
+
+    def put(self, etag: str, png: bytes) -> None:
+        self._remember(etag, png)
+        path = self._path(etag)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(png)
+            os.replace(tmp, path)
+        except OSError:
+            logging.exception("Preview cache write failed")
+            return
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def prune(self) -> None:
+        try:
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".png"):
+                    st = entry.stat()
+                    files.append((st.st_mtime, st.st_size, entry.path))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
+
+    def page_sizes(self, doc_hash: str, pdf_bytes: bytes) -> list[tuple[float, float]]:
+        with self._lock:
+            sizes = self._pages.get(doc_hash)
+            if sizes is not None:
+                self._pages.move_to_end(doc_hash)
+                return sizes
+        sizes = read_page_sizes(pdf_bytes)
+        with self._lock:
+            self._pages[doc_hash] = sizes
+            while len(self._pages) > 256:
+                self._pages.popitem(last=False)
+        return sizes
+
+
+preview_cache = PreviewCache()
@@ -0,0 +1,263 @@
+import time
+from contextlib import ExitStack
+
+import numpy as np
+
+from ..config import OCR_SECONDS_PER_MEGAPIXEL
+from ..utils.profiling import stage
+from .ocr_layout import reconstruct_lines
+from .ocr_pool import DEFAULT_LANGUAGES, SCRIPT_GLYPHS, SCRIPT_LANGUAGES, normalize_languages, reader_pool
+
+# Pixels darker than this count as ink
+INK_THRESHOLD = 160
+# Regions with less ink than this are blank and never sent to the recogniser
+BLANK_INK_FRACTION = 0.002
+# A pixel row counts as a rule (underline, box edge) when this much of it is ink
+RULE_ROW_FRACTION = 0.35
+# A pixel column with at most this much ink across a band is a gutter between columns
+GUTTER_INK_FRACTION = 0.002
+# Context kept around each region so glyphs on its edge aren't clipped
+REGION_MARGIN = 4
+
+# Priority weights: labels cluster at the top of the page, in the left column and
+# next to the rules/boxes they describe; later pages rank lower
+TOP_WEIGHT = 1.0
+LEFT_WEIGHT = 0.5
+RULE_WEIGHT = 1.0
+INK_WEIGHT = 0.5
+PAGE_PENALTY = 0.75
+
+# Script detection reads this many pixel rows (a line or two) from each page's top region
+PROBE_HEIGHT_PX = 48
+# A page is read with a non-Latin script's reader once the probe finds this many of
+# its glyphs at this confidence
+PROBE_MIN_GLYPHS = 3
+PROBE_MIN_CONFIDENCE = 0.4
+
+
+def _split_bands(row_ink: np.ndarray, band_px: int) -> list[tuple[int, int]]:
+    # Cut near every `band_px` rows, at the emptiest row within a quarter band either side
+    height = len(row_ink)
+    bands = []
+    start = 0
+    while height - start > band_px * 1.25:
+        lo = start + band_px - band_px // 4
+        hi = min(height - 1, start + band_px + band_px // 4)
+        cut = lo + int(np.argmin(row_ink[lo:hi + 1]))
+        bands.append((start, cut))
+        start = cut
+    bands.append((start, height))
+    return bands
+
+
+def _split_columns(band: np.ndarray) -> list[tuple[int, int]]:
+    # Split a band in two only at a clear gutter in its middle third
+    width = band.shape[1]
+    col_ink = band.sum(axis=0)
+    lo, hi = width // 3, 2 * width // 3
+    if hi <= lo:
+        return [(0, width)]
+    gutter = lo + int(np.argmin(col_ink[lo:hi]))
+    if col_ink[gutter] > GUTTER_INK_FRACTION * band.shape[0]:
+        return [(0, width)]
+    return [(0, gutter), (gutter, width)]
+
+
+def _count_rules(region: np.ndarray) -> int:
+    rule_rows = region.mean(axis=1) >= RULE_ROW_FRACTION
+    # Count runs of consecutive rule rows (a thick line is one rule)
+    return int(np.count_nonzero(rule_rows[1:] & ~rule_rows[:-1]) + rule_rows[0]) if len(rule_rows) else 0
+
+
+def plan_regions(gray: np.ndarray, page_index: int = 0, band_px: int | None = None) -> list[dict]:
+    """
+    Split a page raster into bands (and two columns where there's a gutter) and rank them.
+
+    Each region gets a priority from its position (top, left) plus how many rules/box
+    edges and how much ink it contains. Blank regions are marked and never recognised.
+    """
+    height, width = gray.shape
+    dark = gray < INK_THRESHOLD
+    band_px = band_px or max(32, height // 8)
+    regions = []
+    for y0, y1 in _split_bands(dark.sum(axis=1), band_px):
+        band = dark[y0:y1]
+        for x0, x1 in _split_columns(band):
+            region = band[:, x0:x1]
+            ink = float(region.mean()) if region.size else 0.0
+            blank = ink < BLANK_INK_FRACTION
+            priority = (
+                TOP_WEIGHT * (1.0 - (y0 + y1) / 2.0 / height)
+                + LEFT_WEIGHT * (1.0 - (x0 + x1) / 2.0 / width)
+                + RULE_WEIGHT * min(_count_rules(region), 3) / 3.0
+                + INK_WEIGHT * min(ink / 0.08, 1.0)
+                - PAGE_PENALTY * page_index
+            )
+            regions.append({
+                "page": page_index,
+                "box": (x0, y0, x1, y1),
+                "priority": round(priority, 3),
+                "status": "blank" if blank else "pending",
+            })
+    return regions
+
+
+def _probe_strip(gray: np.ndarray, region: dict) -> np.ndarray:
+    # The inkiest PROBE_HEIGHT_PX rows of the region: most likely a line of label text
+    x0, y0, x1, y1 = region["box"]
+    row_ink = (gray[y0:y1, x0:x1] < INK_THRESHOLD).sum(axis=1)
+    height = min(PROBE_HEIGHT_PX, len(row_ink))
+    window = np.convolve(row_ink, np.ones(height, dtype=np.int64), mode="valid")
+    top = y0 + int(np.argmax(window))
+    return np.ascontiguousarray(gray[top:top + height, x0:x1])
+
+
+def _script_glyphs(result, script: str) -> int:
+    lo, hi = SCRIPT_GLYPHS[script]
+    return sum(
+        sum(1 for ch in text if lo <= ch <= hi)
+        for _, text, conf in result
+        if conf >= PROBE_MIN_CONFIDENCE
+    )
+
+
+def _hold_reader(held: ExitStack, languages) -> tuple[object, float]:
+    # Acquire a reader for the life of `held`; returns it with the seconds spent loading
+    started = time.monotonic()
+    with stage("ocr-reader"):
+        reader = held.enter_context(reader_pool.reader(languages))
+    return reader, time.monotonic() - started
+
+
+def detect_page_languages(probes: dict, deadline: float, seconds_per_mpx: float) -> tuple[dict, float]:
+    """
+    Pick a reader language set for each page from a small strip of it.
+
+    `probes` maps page index -> strip raster. Each non-Latin script's reader (which
+    also reads English) looks at every strip; a page goes to the script whose reader
+    finds the most of its own glyphs, at least PROBE_MIN_GLYPHS of them. Other pages,
+    and every page once the probes no longer fit before `deadline`, are read in English.
+
+    Returns (page index -> language set, seconds spent loading readers).
+    """
+    glyphs = {index: {} for index in probes}
+    probe_mpx = sum(max(strip.size / 1e6, 1e-3) for strip in probes.values())
+    load_seconds = 0.0
+    for script in SCRIPT_GLYPHS:
+        if probe_mpx * seconds_per_mpx > deadline - time.monotonic():
+            break
+        with ExitStack() as held:
+            reader, loaded = _hold_reader(held, SCRIPT_LANGUAGES[script])
+            load_seconds += loaded
+            if probe_mpx * seconds_per_mpx > deadline - time.monotonic():
+                break
+            with stage("ocr-script-probe"):
+                for index, strip in probes.items():
+                    glyphs[index][script] = _script_glyphs(reader.readtext(strip), script)
+
+    chosen = {}
+    for index, counts in glyphs.items():
+        script, found = max(counts.items(), key=lambda kv: kv[1], default=(None, 0))
+        chosen[index] = SCRIPT_LANGUAGES[script] if found >= PROBE_MIN_GLYPHS else DEFAULT_LANGUAGES
+    return chosen, load_seconds
+
+
+def progressive_ocr(pages: list[dict], deadline: float) -> tuple[list[str], dict]:
+    """
+    Recognise the regions of `pages` in priority order until `deadline` (time.monotonic()).
+
+    `pages` items are {"index", "gray" (2-D uint8 raster), "languages", "scale"} plus an
+    optional "band_px"; scale converts raster pixels to the coordinates reported back
+    (PDF points for PDFs). Pages whose "languages" is None get theirs from
+    `detect_page_languages`, probing a strip of their top-priority region.
+    A region is only started if the running cost estimate says it fits in the time left,
+    so recognition stops cleanly at the deadline instead of mid-page. Readers are acquired
+    before the first region and their load time counts against the budget, so the deadline
+    holds even on a cold start; no reader is loaded once it has passed. The coverage
+    report shows the load time as `reader_load_seconds`.
+
+    Returns (text lines in page order, coverage report).
+    """
+    started = time.monotonic()
+    by_index = {p["index"]: p for p in pages}
+    regions = []
+    for p in pages:
+        regions.extend(plan_regions(p["gray"], p["index"], p.get("band_px")))
+
+    pending = sorted((r for r in regions if r["status"] == "pending"), key=lambda r: -r["priority"])
+    seconds_per_mpx = OCR_SECONDS_PER_MEGAPIXEL
+    fragments = {p["index"]: [] for p in pages}
+    probes = {}
+    for region in pending:
+        page = by_index[region["page"]]
+        if page["languages"] is None and page["index"] not in probes:
+            probes[page["index"]] = _probe_strip(page["gray"], region)
+    page_languages = {p["index"]: p["languages"] and normalize_languages(p["languages"]) for p in pages}
+    load_seconds = 0.0
+    if probes:
+        detected, load_seconds = detect_page_languages(probes, deadline, seconds_per_mpx)
+        page_languages.update(detected)
+    with ExitStack() as held:
+        readers = {}
+        # In priority order, so a budget spent on loading costs the least useful pages
+        for index in dict.fromkeys(r["page"] for r in pending):
+            key = page_languages[index]
+            if key not in readers and time.monotonic() < deadline:
+                readers[key], loaded = _hold_reader(held, key)
+                load_seconds += loaded
+
+        for region in pending:
+            page = by_index[region["page"]]
+            gray = page["gray"]
+            x0, y0, x1, y1 = region["box"]
+            x0, y0 = max(0, x0 - REGION_MARGIN), max(0, y0 - REGION_MARGIN)
+            x1, y1 = min(gray.shape[1], x1 + REGION_MARGIN), min(gray.shape[0], y1 + REGION_MARGIN)
+            megapixels = max((x1 - x0) * (y1 - y0) / 1e6, 1e-3)
+
+            reader = readers.get(page_languages[region["page"]])
+            if reader is None or megapixels * seconds_per_mpx > deadline - time.monotonic():
+                # A smaller, lower-priority region may still fit, so keep going
+                region["status"] = "skipped"
+                continue
+
+            crop = np.ascontiguousarray(gray[y0:y1, x0:x1])
+            with stage("ocr-recognize"):
+                region_started = time.monotonic()
+                result = reader.readtext(crop)
+                observed = (time.monotonic() - region_started) / megapixels
+            # Blend the observed cost into the estimate used for the next region
+            seconds_per_mpx = 0.5 * seconds_per_mpx + 0.5 * observed
+
+            for box, text, conf in result:
+                fragments[region["page"]].append(([(x + x0, y + y0) for x, y in box], text, conf))
+            region["status"] = "recognized"
+
+    lines = []
+    for index in sorted(fragments):
+        # Regions of a page are merged before rebuilding lines, so rows cut by a column
+        # split are joined again
+        lines.extend(reconstruct_lines(fragments[index]))
+
+    counts = {"recognized": 0, "skipped": 0, "blank": 0}
+    for r in regions:
+        counts[r["status"]] += 1
+    coverage = {
+        "complete": counts["skipped"] == 0,
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+        "reader_load_seconds": round(load_seconds, 3),
+        "pages_planned": len(pages),
+        "page_languages": [
+            {"page": index, "languages": list(langs)} for index, langs in sorted(page_languages.items()) if langs
+        ],
+        **counts,
+        "regions": [
+            {
+                "page": r["page"],
+                "rect": [round(v * by_index[r["page"]]["scale"], 1) for v in r["box"]],
+                "priority": r["priority"],
+                "status": r["status"],
+            }
+            for r in regions
+        ],
+    }
+    return lines, coverage
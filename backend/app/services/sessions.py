@@ -0,0 +1,98 @@
+from ..utils.shared_cache import shared_cache
+from .eligibility import QUESTIONS, assess_applicability
+from .info_intent import determine_required
+
+SESSION_NAMESPACE = "session"
+
+_QUESTION_TYPES = {q["key"]: q["type"] for q in QUESTIONS}
+
+
+def normalize_answers(answers: dict) -> dict:
+    """Validate applicant answers against eligibility.QUESTIONS and coerce their types."""
+    out = {}
+    for key, value in (answers or {}).items():
+        kind = _QUESTION_TYPES.get(key)
+        if kind is None:
+            raise ValueError(f"Unknown question: {key}")
+        if value is None:
+            out[key] = None
+        elif kind == "bool":
+            if isinstance(value, bool):
+                out[key] = value
+            elif str(value).strip().lower() in ("yes", "y", "true", "1"):
+                out[key] = True
+            elif str(value).strip().lower() in ("no", "n", "false", "0"):
+                out[key] = False
+            else:
+                raise ValueError(f"Expected yes/no for {key}")
+        else:
+            out[key] = str(value).strip()
+    return out
+
+
+def _apply_answers(steps: list[dict], answers: dict) -> list[dict]:
+    # Only `required` and `applicability` depend on the answers; everything else is reused
+    recomputed = []
+    for s in steps:
+        required = s["base_required"] or determine_required(s.get("title", ""), answers)
+        recomputed.append({"id": s["id"], "title": s.get("title", ""), "required": required})
+    applicability = {s["id"]: s["applicability"] for s in assess_applicability(recomputed, answers)}
+
+    out = []
+    for s, r in zip(steps, recomputed):
+        new = dict(s)
+        new["required"] = r["required"]
+        new["applicability"] = applicability[s["id"]]
+        out.append(new)
+    return out
+
+
+def create_session(saved_as: str, analysis: dict) -> None:
+    steps = [dict(s, base_required=bool(s.get("required"))) for s in analysis.get("steps", [])]
+    shared_cache.set(SESSION_NAMESPACE, saved_as, {
+        "saved_as": saved_as,
+        "filename": analysis.get("filename"),
+        "extraction_method": analysis.get("extraction_method"),
+        "answers": {},
+        "steps": _apply_answers(steps, {}),
+    })
+
+
+def get_session(saved_as: str) -> dict | None:
+    return shared_cache.get(SESSION_NAMESPACE, saved_as)
+
+
+def update_answers(saved_as: str, answers: dict) -> dict | None:
+    """
+    Merge new applicant answers into a session and recompute applicability.
+
+    A null answer clears that question. Returns only the steps whose
+    `required`/`applicability` changed, or None if the session doesn't exist.
+    """
+    updates = normalize_answers(answers)
+
+    def merge(session):
+        if session is None:
+            return None, None
+        merged = {**session.get("answers", {}), **updates}
+        merged = {k: v for k, v in merged.items() if v is not None}
+        before = {s["id"]: (s["required"], s["applicability"]) for s in session["steps"]}
+        steps = _apply_answers(session["steps"], merged)
+
+        changed = [
+            {"id": s["id"], "title": s["title"], "required": s["required"], "applicability": s["applicability"]}
+            for s in steps
+            if before.get(s["id"]) != (s["required"], s["applicability"])
+        ]
+        session["answers"] = merged
+        session["steps"] = steps
+        return session, {
+            "saved_as": saved_as,
+            "answers": merged,
+            "mandatory": sum(1 for s in steps if s["required"]),
+            "optional": sum(1 for s in steps if not s["required"]),
+            "changed": changed,
+        }
+
+    # Read, merge and write under the store's lock so concurrent updates aren't lost
+    return shared_cache.update(SESSION_NAMESPACE, saved_as, merge)
@@ -0,0 +1,109 @@
+import fitz  # PyMuPDF
+
+from ..config import (
+    LAYOUT_DETECTION,
+    LAYOUT_MAX_PAGES,
+    STREAM_BLANK_PAGE_LIMIT,
+    STREAM_MIN_PAGES,
+    STREAM_MAX_PAGES,
+    STREAM_MEMORY_CEILING_MB,
+    STREAM_STALE_PAGE_LIMIT,
+)
+from ..utils.helpers import current_rss_bytes
+from ..utils.profiling import note, stage
+from ..utils.text_cleaner import BlockCleaner
+from .ai_engine import ActionStepScanner
+from .layout_detector import detect_layout_fields
+from .pdf_parser import iter_page_texts
+
+# How often MuPDF's internal object store is flushed while streaming
+STORE_SHRINK_EVERY = 16
+
+
+def analyze_pdf_streaming(
+    doc: fitz.Document,
+    context_questions: dict | None = None,
+    min_pages: int = STREAM_MIN_PAGES,
+    max_pages: int = STREAM_MAX_PAGES,
+    memory_ceiling_mb: int = STREAM_MEMORY_CEILING_MB,
+    stale_page_limit: int = STREAM_STALE_PAGE_LIMIT,
+    blank_page_limit: int = STREAM_BLANK_PAGE_LIMIT,
+) -> dict | None:
+    """
+    Analyze a large text-layer PDF page by page without building the full document string.
+
+    `doc` is left open: when this returns None (short documents, AcroForm PDFs, or PDFs
+    whose first `blank_page_limit` pages have no text layer) the caller passes the same
+    handle on to `extract_from_pdf`.
+
+    Pages are fed to the same block cleaner and scanner as the regular path, joined the
+    way `extract_from_pdf` joins them, so a scan that reads every page returns exactly
+    the steps the regular path would.
+
+    Early-stop policy (first one that triggers wins):
+    - `max_pages` pages have been read
+    - RSS grew by more than `memory_ceiling_mb` since the scan started
+    - `stale_page_limit` consecutive pages produced no new field label
+
+    The result carries `page_coverage`; `complete` is False when the scan stopped early.
+    """
+    if len(doc) < min_pages or doc.is_form_pdf:
+        return None
+
+    cleaner = BlockCleaner()
+    scanner = ActionStepScanner()
+    pages_scanned = 0
+    stale_pages = 0
+    found_text = False
+    stop_reason = None
+    rss_ceiling = current_rss_bytes() + memory_ceiling_mb * 1024 * 1024
+
+    note(page_count=len(doc))
+    with stage("stream-scan"):
+        for _, text in iter_page_texts(doc, max_pages):
+            pages_scanned += 1
+            text = text.strip()
+            before = len(scanner.fields)
+            if text:
+                # Non-blank pages are joined with a newline, as in extract_from_pdf
+                for block in cleaner.feed("\n" + text if found_text else text):
+                    scanner.scan(block)
+                found_text = True
+            elif pages_scanned >= blank_page_limit and not found_text:
+                # Scanned PDF: stop reading empty text layers and leave it to OCR
+                break
+            text = None
+            stale_pages = 0 if len(scanner.fields) > before else stale_pages + 1
+
+            if pages_scanned % STORE_SHRINK_EVERY == 0:
+                fitz.TOOLS.store_shrink(100)
+
+            if stale_pages >= stale_page_limit and scanner.fields:
+                stop_reason = "no-new-fields"
+                break
+            if memory_ceiling_mb and current_rss_bytes() > rss_ceiling:
+                stop_reason = "memory-ceiling"
+                break
+        for block in cleaner.close():
+            scanner.scan(block)
+
+    if not found_text:
+        # Scanned PDF: let the OCR path handle it
+        return None
+
+    if stop_reason is None and pages_scanned < len(doc):
+        stop_reason = "page-cap"
+    extracted = {
+        "result": scanner.result(context_questions),
+        "method": "text-layer",
+        "page_coverage": {
+            "complete": stop_reason is None,
+            "pages_scanned": pages_scanned,
+            "total_pages": len(doc),
+            "stopped_early": stop_reason,
+        },
+    }
+    if LAYOUT_DETECTION:
+        with stage("layout"):
+            extracted["layout_fields"] = detect_layout_fields(doc, LAYOUT_MAX_PAGES)
+    return extracted
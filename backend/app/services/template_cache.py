@@ -0,0 +1,100 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+from ..config import TEMPLATE_CACHE_MAX_ENTRIES, TEMPLATE_CACHE_MAX_MB
+from ..utils.shared_cache import CODE_VERSION, shared_cache
+from .acroform import read_field_table
+
+# Widget indexes are shared across worker processes under this SharedCache namespace
+INDEX_NAMESPACE = "template-index"
+
+
+def build_widget_index(pdf_bytes: bytes) -> dict:
+    """Map field names (and signature fields) to (page_index, widget_xref) in one pass."""
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        table = read_field_table(doc)
+        if len(table):
+            return table.widget_index()
+        # Widgets that aren't reachable from /AcroForm /Fields
+        fields = {}
+        signatures = []
+        for page in doc:
+            page_has_signature = False
+            for w in page.widgets() or []:
+                if not w.field_name:
+                    continue
+                fields.setdefault(w.field_name, []).append((page.number, w.xref))
+                # Only the first signature field per page receives the image
+                if not page_has_signature and "signature" in w.field_name.lower():
+                    signatures.append((page.number, w.xref))
+                    page_has_signature = True
+    finally:
+        doc.close()
+    return {"fields": fields, "signatures": signatures}
+
+
+class TemplateCache:
+    """
+    Bounded LRU of PDF templates used by /fill: the file bytes plus a widget index.
+
+    Entries are keyed by content hash so the same template reached through different
+    `saved_as` ids is parsed once. Bounded by entry count and total bytes.
+
+    The LRU itself is per process. The widget index is also stored in the shared SQLite
+    cache, so under several workers a template is parsed once per node; each worker
+    still keeps its own copy of the PDF bytes.
+    """
+
+    def __init__(self, max_entries: int = TEMPLATE_CACHE_MAX_ENTRIES, max_mb: int = TEMPLATE_CACHE_MAX_MB):
+        self.max_entries = max_entries
+        self.max_bytes = max_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._names = OrderedDict()  # saved_as -> content hash
+        self._bytes = 0
+
+    def get(self, pdf_bytes: bytes) -> dict:
+        key = hashlib.sha256(pdf_bytes).hexdigest()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        index_key = f"{CODE_VERSION}:{key}"
+        index = shared_cache.get(INDEX_NAMESPACE, index_key)
+        if index is None:
+            index = build_widget_index(pdf_bytes)
+            shared_cache.set(INDEX_NAMESPACE, index_key, index)
+        entry = {"key": key, "bytes": pdf_bytes, "fields": index["fields"], "signatures": index["signatures"]}
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = entry
+                self._bytes += len(pdf_bytes)
+                while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                    _, old = self._entries.popitem(last=False)
+                    self._bytes -= len(old["bytes"])
+            return self._entries.get(key, entry)
+
+    def get_saved(self, saved_as: str, path: Path) -> dict:
+        # Saved uploads are never rewritten, so the name -> hash mapping stays valid
+        with self._lock:
+            key = self._names.get(saved_as)
+            entry = self._entries.get(key) if key else None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = self.get(path.read_bytes())
+        with self._lock:
+            self._names[saved_as] = entry["key"]
+            while len(self._names) > self.max_entries * 4:
+                self._names.popitem(last=False)
+        return entry
+
+
+template_cache = TemplateCache()
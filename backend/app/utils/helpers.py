@@ -1,3 +1,6 @@
+import os
+import sys
+
 from fastapi import UploadFile
 
 
@@ -6,3 +9,20 @@ async def save_upload_file(upload_file: UploadFile, destination: str) -> None:
     with open(destination, "wb") as f:
         f.write(content)
     await upload_file.close()
+
+
+def current_rss_bytes() -> int:
+    # Resident set size of this process; 0 when the platform doesn't expose it
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is the peak (KiB on Linux, bytes on macOS); best effort fallback
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return 0
@@ -0,0 +1,331 @@
+"""
+Per-request stage timings, stack sampling and opt-in deterministic profiling.
+
+Every request gets a RequestProfile. Code marks its expensive parts with `stage(...)`
+and records metadata with `note(...)`. While a stage runs in a worker thread, that
+thread is stack-sampled, so slow requests get a hot-spot summary without any opt-in.
+Requests sent with the privileged X-PaperPilot-Profile header (or every request when
+PROFILE_ALL_REQUESTS is set) additionally run their stages under cProfile.
+
+Reports hold only timings, counters and function names, never document content.
+"""
+import asyncio
+import contextvars
+import cProfile
+import hmac
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from uuid import uuid4
+
+from starlette.concurrency import run_in_threadpool
+
+from ..config import (
+    PROFILE_ALL_REQUESTS,
+    PROFILE_MAX_REPORTS,
+    PROFILE_REPORT_DIR,
+    PROFILE_SAMPLE_INTERVAL,
+    PROFILE_TOKEN,
+    PROFILE_TOP_FUNCTIONS,
+    SLOW_REQUEST_SECONDS,
+)
+
+PROFILE_HEADER = "X-PaperPilot-Profile"
+PROFILE_ID_HEADER = "X-PaperPilot-Profile-Id"
+
+_current = contextvars.ContextVar("paperpilot_profile", default=None)
+_stage_path = contextvars.ContextVar("paperpilot_stage_path", default=())
+
+# Longest prefixes first, so labels are relative to the package or site-packages
+_PATH_ROOTS = sorted({p for p in sys.path if p and os.path.isdir(p)} | {os.getcwd()}, key=len, reverse=True)
+
+
+def _code_label(filename: str, line: int, name: str) -> str:
+    for root in _PATH_ROOTS:
+        if filename.startswith(root):
+            filename = filename[len(root):].lstrip("/\\")
+            break
+    return f"{filename}:{line}({name})"
+
+
+def is_privileged(headers) -> bool:
+    value = headers.get(PROFILE_HEADER)
+    if not (PROFILE_TOKEN and value):
+        return False
+    # Compared as bytes: compare_digest rejects non-ASCII str, and a header that can't
+    # be compared simply doesn't get a profile
+    try:
+        return hmac.compare_digest(value.encode(), PROFILE_TOKEN.encode())
+    except (TypeError, UnicodeError):
+        return False
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str, deterministic: bool = False):
+        self.id = uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.deterministic = deterministic
+        self.created = time.time()
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.info = {}
+        self.samples = Counter()       # function -> samples with it anywhere on the stack
+        self.self_samples = Counter()  # function -> samples with it as the innermost frame
+        self.sample_count = 0
+        self._threads = {}  # thread ident -> [stage depth, cProfile.Profile or None]
+        self._stats = None
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def enter_thread(self) -> None:
+        ident = threading.get_ident()
+        with self._lock:
+            state = self._threads.setdefault(ident, [0, None])
+            state[0] += 1
+            if state[0] > 1 or not self.deterministic:
+                return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler already owns this thread
+            return
+        state[1] = profiler
+
+    def exit_thread(self) -> None:
+        ident = threading.get_ident()
+        with self._lock:
+            state = self._threads.get(ident)
+            if state is None:
+                return
+            state[0] -= 1
+            if state[0] > 0:
+                return
+            del self._threads[ident]
+        profiler = state[1]
+        if profiler is not None:
+            profiler.disable()
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profiler)
+                else:
+                    self._stats.add(profiler)
+
+    def sample(self, frames: dict) -> None:
+        with self._lock:
+            idents = list(self._threads)
+        for ident in idents:
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            self.sample_count += 1
+            self.self_samples[_code_label(frame.f_code.co_filename, frame.f_code.co_firstlineno, frame.f_code.co_name)] += 1
+            seen = set()
+            while frame is not None:
+                code = frame.f_code
+                if code not in seen:
+                    seen.add(code)
+                    self.samples[_code_label(code.co_filename, code.co_firstlineno, code.co_name)] += 1
+                frame = frame.f_back
+
+    def report(self, status: int, total_seconds: float) -> dict:
+        report = {
+            "id": self.id,
+            "created": self.created,
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "total_seconds": round(total_seconds, 4),
+            "stages": {k: round(v, 4) for k, v in self.stages.items()},
+            **self.info,
+            "sampling": {
+                "interval": PROFILE_SAMPLE_INTERVAL,
+                "samples": self.sample_count,
+                "top": [
+                    {"function": fn, "samples": n, "self_samples": self.self_samples.get(fn, 0)}
+                    for fn, n in self.samples.most_common(PROFILE_TOP_FUNCTIONS)
+                ],
+            },
+        }
+        if self._stats is not None:
+            rows = []
+            for (filename, line, name), (_, calls, tottime, cumtime, _) in self._stats.stats.items():
+                rows.append({
+                    "function": _code_label(filename, line, name),
+                    "calls": calls,
+                    "tottime": round(tottime, 4),
+                    "cumtime": round(cumtime, 4),
+                })
+            rows.sort(key=lambda r: r["cumtime"], reverse=True)
+            report["profile"] = rows[:PROFILE_TOP_FUNCTIONS]
+        return report
+
+
+class StackSampler:
+    """Background thread that samples the worker threads of in-flight requests."""
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._profiles = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles.add(profile)
+            # Threads don't survive a fork, so each worker process starts its own
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def remove(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles.discard(profile)
+            if not self._profiles:
+                self._wake.clear()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                profiles = list(self._profiles)
+            if profiles:
+                frames = sys._current_frames()
+                for profile in profiles:
+                    profile.sample(frames)
+                frames = None
+
+
+class ProfileStore:
+    """Bounded ring of JSON reports in a local directory (shared by all workers)."""
+
+    def __init__(self, directory=PROFILE_REPORT_DIR, max_reports: int = PROFILE_MAX_REPORTS):
+        self.directory = Path(directory)
+        self.max_reports = max_reports
+
+    def _files(self) -> list[Path]:
+        try:
+            return sorted(self.directory.glob("*.json"))
+        except OSError:
+            return []
+
+    def write(self, report: dict) -> None:
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / f"{time.time_ns()}-{report['id']}.json"
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(report), encoding="utf-8")
+            os.replace(tmp, path)
+            files = self._files()
+            for old in files[:max(0, len(files) - self.max_reports)]:
+                old.unlink(missing_ok=True)
+        except OSError:
+            logging.exception("Could not write profile report")
+
+    def list(self, limit: int = 20) -> list[dict]:
+        reports = []
+        for path in reversed(self._files()):
+            if len(reports) >= limit:
+                break
+            try:
+                reports.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue  # pruned or being written by another worker
+        return reports
+
+    def get(self, report_id: str) -> dict | None:
+        for path in self.directory.glob(f"*-{report_id}.json"):
+            try:
+                return json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                return None
+        return None
+
+
+sampler = StackSampler()
+profile_store = ProfileStore()
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time a stage of the current request. Nested stages are recorded as "outer/inner".
+
+    Stages entered from worker threads also mark the thread for sampling/profiling;
+    on the event loop only the time is recorded.
+    """
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    path = _stage_path.get() + (name,)
+    token = _stage_path.set(path)
+    track = not _in_event_loop()
+    if track:
+        profile.enter_thread()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_stage("/".join(path), time.perf_counter() - started)
+        if track:
+            profile.exit_thread()
+        _stage_path.reset(token)
+
+
+def add_stage(name: str, seconds: float) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.add_stage("/".join(_stage_path.get() + (name,)), seconds)
+
+
+def note(**info) -> None:
+    # Counters and labels only (page counts, methods, sizes): never document text
+    profile = _current.get()
+    if profile is not None:
+        profile.info.update(info)
+
+
+async def profile_requests(request, call_next):
+    """HTTP middleware: profile the request and keep a report if it was slow or opted in."""
+    deterministic = PROFILE_ALL_REQUESTS or is_privileged(request.headers)
+    profile = RequestProfile(request.method, request.url.path, deterministic)
+    token = _current.set(profile)
+    sampler.add(profile)
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        sampler.remove(profile)
+        _current.reset(token)
+        total = time.perf_counter() - profile.started
+        if deterministic or total >= SLOW_REQUEST_SECONDS:
+            await run_in_threadpool(profile_store.write, profile.report(status, total))
+    if deterministic:
+        response.headers[PROFILE_ID_HEADER] = profile.id
+    return response
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from ..config import SHARED_CACHE_MAX_ENTRIES, SHARED_CACHE_PATH
+
+# A namespace is pruned back to the size limit every this many writes to it (per process)
+PRUNE_EVERY = 64
+
+
+def _code_version() -> str:
+    # Digest of the app's source. The cache outlives restarts and deploys, so keys of
+    # results computed by the code include it: changed detectors never serve stale entries
+    digest = hashlib.sha256()
+    app_dir = Path(__file__).resolve().parents[1]
+    for path in sorted(app_dir.rglob("*.py")):
+        digest.update(path.relative_to(app_dir).as_posix().encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+CODE_VERSION = _code_version()
+
+
+class SharedCache:
+    """
+    Small JSON key/value cache in a local SQLite file (WAL mode).
+
+    Every worker process opens its own connection, so all workers behind the production
+    launcher see the same entries. The cache is best-effort: SQLite errors are logged
+    and treated as misses.
+    """
+
+    def __init__(self, path=SHARED_CACHE_PATH, max_entries: int = SHARED_CACHE_MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = Counter()  # namespace -> writes by this process
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # Connections must not cross a fork
+        if conn is None or self._local.pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, accessed REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (namespace, accessed)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, namespace: str, key: str):
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT value FROM cache WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE cache SET accessed = ? WHERE namespace = ? AND key = ?", (time.time(), namespace, key)
+            )
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError):
+            logging.exception("Shared cache read failed")
+            return None
+
+    def set(self, namespace: str, key: str, value) -> None:
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, accessed) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), time.time()),
+            )
+            self._wrote(namespace)
+        except (sqlite3.Error, TypeError, ValueError):
+            logging.exception("Shared cache write failed")
+
+    def update(self, namespace: str, key: str, fn):
+        """
+        Atomically read-modify-write one entry: `fn(value)` returns (new_value, result).
+
+        Runs inside a BEGIN IMMEDIATE transaction, which holds SQLite's write lock for
+        the whole update, so concurrent updates from any thread or worker are
+        serialised. A new_value of None leaves the entry unchanged. Returns `result`;
+        on SQLite errors `fn` sees None, as if the entry were missing.
+        """
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.Error:
+            logging.exception("Shared cache update failed")
+            return fn(None)[1]
+        try:
+            row = conn.execute(
+                "SELECT value FROM cache WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            new_value, result = fn(json.loads(row[0]) if row is not None else None)
+            if new_value is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, accessed) VALUES (?, ?, ?, ?)",
+                    (namespace, key, json.dumps(new_value), time.time()),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            raise
+        if new_value is not None:
+            self._wrote(namespace)
+        return result
+
+    def delete(self, namespace: str, key: str) -> None:
+        try:
+            self._conn().execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+        except sqlite3.Error:
+            logging.exception("Shared cache delete failed")
+
+    def _wrote(self, namespace: str) -> None:
+        self._writes[namespace] += 1
+        if self._writes[namespace] % PRUNE_EVERY == 0:
+            try:
+                self.prune(namespace)
+            except sqlite3.Error:
+                logging.exception("Shared cache prune failed")
+
+    def prune(self, namespace: str) -> None:
+        # Keep only the most recently accessed `max_entries` rows of this namespace
+        self._conn().execute(
+            "DELETE FROM cache WHERE namespace = ? AND key NOT IN ("
+            " SELECT key FROM cache WHERE namespace = ? ORDER BY accessed DESC LIMIT ?)",
+            (namespace, namespace, self.max_entries),
+        )
+
+
+shared_cache = SharedCache()
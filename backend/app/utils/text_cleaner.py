@@ -1,19 +1,88 @@
 import re
+from typing import Iterator
+
+# Compiled once: clean_text runs per block for streamed and fused scans
+# Runs of spaces/tabs; a lone space is already normal and is left alone
+_SPACES = re.compile(r"[ \t]{2,}|\t")
+_NBSP = re.compile(r"\u00a0")
+_AMOUNT_SUFFIX = re.compile(r"(\d)\s*[pP]\b")
+_AMOUNT_DASH = re.compile(r"(\d)\s*[/\\-]\s*\b")
+_SPACE_BEFORE_PUNCT = re.compile(r"\s+([,:;])")
+_SPACE_AFTER_OPEN = re.compile(r"([(/])\s+")
+_SPACE_BEFORE_CLOSE = re.compile(r"\s+([)/])")
+_BLANK_LINES = re.compile(r"\n{2,}")
+
 
 def clean_text(text: str) -> str:
     # Normalize whitespace
-    text = re.sub(r"[ \t]+", " ", text)
-    text = re.sub(r"\u00a0", " ", text)
+    text = _SPACES.sub(" ", text)
+    text = _NBSP.sub(" ", text)
 
     # Common OCR artifacts around amounts/currency
-    text = re.sub(r"(\d)\s*[pP]\b", r"\1", text)
-    text = re.sub(r"(\d)\s*[/\\-]\s*\b", r"\1 ", text)
+    text = _AMOUNT_SUFFIX.sub(r"\1", text)
+    text = _AMOUNT_DASH.sub(r"\1 ", text)
 
     # Clean up awkward spacing around punctuation
-    text = re.sub(r"\s+([,:;])", r"\1", text)
-    text = re.sub(r"([(/])\s+", r"\1", text)
-    text = re.sub(r"\s+([)/])", r"\1", text)
+    text = _SPACE_BEFORE_PUNCT.sub(r"\1", text)
+    text = _SPACE_AFTER_OPEN.sub(r"\1", text)
+    text = _SPACE_BEFORE_CLOSE.sub(r"\1", text)
 
     # Normalize newlines
-    text = re.sub(r"\n{2,}", "\n", text)
+    text = _BLANK_LINES.sub("\n", text)
     return text.strip()
+
+
+# A line break that clean_text's rules can't reach across: the text before it doesn't end
+# in a digit, "(", "/", "\\", "-" or p/P ("5p" cleans to "5"), and the text after it
+# doesn't start with ",", ":", ";", ")" or "/"
+_SAFE_BREAK = re.compile(r"[^\s0-9(/\\\-pP]\s*\n\s*[^\s,:;)/]")
+
+# Characters cleaned per block; blocks end at the first safe break after this
+BLOCK_CHARS = 8192
+
+
+class BlockCleaner:
+    """
+    Incremental `clean_text`: text is fed in consecutive chunks (pages, for instance) and
+    comes back as cleaned blocks as soon as they are final.
+
+    Blocks are cut only at line breaks no cleanup rule spans, so the lines of the blocks
+    are exactly the lines of `clean_text` over the concatenated chunks, while only about
+    one block of uncleaned text is held at a time.
+    """
+
+    def __init__(self, block_chars: int = BLOCK_CHARS):
+        self.block_chars = block_chars
+        self._pending = ""
+
+    def feed(self, chunk: str) -> Iterator[str]:
+        pending = self._pending + chunk
+        start = 0
+        while len(pending) - start > self.block_chars:
+            m = _SAFE_BREAK.search(pending, start + self.block_chars)
+            if not m:
+                break
+            end = m.start() + 1
+            yield clean_text(pending[start:end])
+            start = end
+        self._pending = pending[start:]
+
+    def close(self) -> Iterator[str]:
+        pending, self._pending = self._pending, ""
+        if pending:
+            yield clean_text(pending)
+
+
+def iter_cleaned_blocks(text: str, block_chars: int = BLOCK_CHARS) -> Iterator[str]:
+    cleaner = BlockCleaner(block_chars)
+    yield from cleaner.feed(text)
+    yield from cleaner.close()
+
+
+def iter_normalized_lines(text: str, block_chars: int = BLOCK_CHARS) -> Iterator[str]:
+    """The non-blank, stripped lines of `clean_text(text)`, produced block by block."""
+    for block in iter_cleaned_blocks(text, block_chars):
+        for line in block.splitlines():
+            line = line.strip()
+            if line:
+                yield line
@@ -0,0 +1,52 @@
+"""
+Worker side of `python -m backend`.
+
+Kept out of `backend/__main__.py` so spawned worker processes can import (and unpickle)
+these functions by module name.
+"""
+import hashlib
+import time
+from pathlib import Path
+
+_languages = None
+_ocr_budget = None
+
+
+def worker_init(languages, ocr_budget) -> None:
+    global _languages, _ocr_budget
+    _languages = languages
+    _ocr_budget = ocr_budget
+
+
+def process_document(task) -> dict:
+    from backend.app.services.analysis import build_analysis, extract_bytes, extract_document
+
+    source_id, payload = task
+    started = time.perf_counter()
+    record = {"source": source_id}
+    try:
+        if isinstance(payload, Path):
+            content = payload.read_bytes()
+            record["sha256"] = hashlib.sha256(content).hexdigest()
+            extracted = extract_document(payload, _languages, _ocr_budget)
+        else:
+            record["sha256"] = hashlib.sha256(payload).hexdigest()
+            extracted = extract_bytes(payload, Path(source_id).suffix.lower(), _languages, _ocr_budget)
+        record.update(build_analysis(extracted))
+        record["status"] = "ok"
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def crash_record(task) -> dict:
+    source_id, payload = task
+    content = payload.read_bytes() if isinstance(payload, Path) else payload
+    return {
+        "source": source_id,
+        "sha256": hashlib.sha256(content).hexdigest(),
+        "status": "error",
+        "error": "BrokenProcessPool: the worker process died while analysing this document",
+    }
@@ -0,0 +1,141 @@
+"""
+Benchmark for AcroForm field extraction.
+
+Compares the per-page `page.widgets()` loop with the field-tree walk
+(`read_field_table`) and checks that both find the same fields with the same
+types, pages and rectangles. Exits 1 on any mismatch.
+
+    python -m backend.bench_acroform
+    python -m backend.bench_acroform --pages 200 --fields-per-page 80
+    python -m backend.bench_acroform forms/*.pdf
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+from backend.app.services.acroform import read_field_table, read_widget_fields
+
+STATES = ["Andhra Pradesh", "Assam", "Bihar", "Goa", "Gujarat", "Kerala", "Maharashtra", "Punjab"]
+
+
+def synthetic_form(pages: int, fields_per_page: int, seed: int = 0) -> bytes:
+    """
+    A large government-style form: per-page sections of text fields, dropdowns,
+    checkboxes and radio groups, written directly as PDF objects.
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+    off = doc.get_new_xref()
+    doc.update_object(off, "<<>>")
+    doc.update_stream(off, b"")
+    roots = []
+    for page_index in range(pages):
+        page = doc.new_page()
+        section = doc.get_new_xref()
+        kids, annots = [], []
+        for n in range(fields_per_page):
+            field = doc.get_new_xref()
+            x0, y0 = 40 + (n % 2) * 270, 800 - (n // 2) * 24
+            rect = f"[{x0} {y0 - 18} {x0 + 240} {y0}]"
+            kind = rng.random()
+            common = f"/T(f{n})/Parent {section} 0 R/TU(Field {n} of section {page_index + 1})"
+            if kind < 0.6:
+                doc.update_object(field, f"<</Type/Annot/Subtype/Widget/FT/Tx{common}/Rect{rect}/MaxLen {rng.choice((10, 40, 120))}>>")
+                annots.append(field)
+            elif kind < 0.75:
+                opts = "".join(f"({s})" for s in STATES)
+                doc.update_object(field, f"<</Type/Annot/Subtype/Widget/FT/Ch/Ff 131072{common}/Rect{rect}/Opt[{opts}]>>")
+                annots.append(field)
+            elif kind < 0.9:
+                doc.update_object(field, f"<</Type/Annot/Subtype/Widget/FT/Btn{common}/Rect[{x0} {y0 - 18} {x0 + 18} {y0}]"
+                                         f"/AP<</N<</Yes {off} 0 R/Off {off} 0 R>>>>>>")
+                annots.append(field)
+            else:
+                buttons = []
+                for b, choice in enumerate(("Yes", "No", "NA")):
+                    widget = doc.get_new_xref()
+                    doc.update_object(widget, f"<</Type/Annot/Subtype/Widget/Parent {field} 0 R"
+                                              f"/Rect[{x0 + b * 30} {y0 - 18} {x0 + b * 30 + 18} {y0}]"
+                                              f"/AP<</N<</{choice} {off} 0 R/Off {off} 0 R>>>>>>")
+                    buttons.append(widget)
+                    annots.append(widget)
+                refs = " ".join(f"{b} 0 R" for b in buttons)
+                doc.update_object(field, f"<</FT/Btn/Ff 49152{common}/Kids[{refs}]>>")
+            kids.append(field)
+        refs = " ".join(f"{k} 0 R" for k in kids)
+        doc.update_object(section, f"<</T(section{page_index + 1})/Kids[{refs}]>>")
+        doc.xref_set_key(page.xref, "Annots", "[" + " ".join(f"{a} 0 R" for a in annots) + "]")
+        roots.append(section)
+    fields = " ".join(f"{r} 0 R" for r in roots)
+    doc.xref_set_key(doc.pdf_catalog(), "AcroForm", f"<</Fields[{fields}]>>")
+    return doc.tobytes()
+
+
+def timed(fn, pdf_bytes: bytes, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        try:
+            started = time.perf_counter()
+            result = fn(doc)
+            best = min(best, time.perf_counter() - started)
+        finally:
+            doc.close()
+    return best, result
+
+
+def comparable(widget_fields: list[dict], table_fields: list[dict]) -> tuple[set, set]:
+    # page.widgets() reports every widget of a radio group; the table one row per field
+    def key(f):
+        return f["name"], f["type"], f["page"]
+
+    old = {key(f) for f in widget_fields}
+    new = {key(f) for f in table_fields}
+    first_rects = {}
+    for f in widget_fields:
+        first_rects.setdefault(f["name"], [round(v, 2) for v in f["rect"]])
+    rect_mismatch = {f["name"] for f in table_fields if first_rects.get(f["name"]) != [round(v, 2) for v in f["rect"]]}
+    return old ^ new, rect_mismatch
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark widget loop vs AcroForm tree walk")
+    parser.add_argument("forms", nargs="*", type=Path, help="PDF forms (default: synthetic)")
+    parser.add_argument("--pages", type=int, default=100, help="pages in the largest synthetic form")
+    parser.add_argument("--fields-per-page", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.forms:
+        corpus = [(p.name, p.read_bytes()) for p in args.forms]
+    else:
+        corpus = [(f"synthetic-{n}p", synthetic_form(n, args.fields_per_page, seed=n)) for n in (1, 10, args.pages)]
+
+    mismatches = 0
+    total_old = total_new = 0.0
+    for name, pdf_bytes in corpus:
+        old_s, old = timed(read_widget_fields, pdf_bytes, args.repeat)
+        new_s, table = timed(read_field_table, pdf_bytes, args.repeat)
+        missing, bad_rects = comparable(old, table.records())
+        same = not missing and not bad_rects
+        mismatches += not same
+        total_old += old_s
+        total_new += new_s
+        print(
+            f"{name:<24} {len(old):>6} widgets {len(table):>6} fields  widgets() {old_s * 1000:9.2f} ms  "
+            f"tree {new_s * 1000:9.2f} ms  x{old_s / new_s if new_s else 0:5.2f}  "
+            f"{'identical' if same else f'MISMATCH ({len(missing)} fields, {len(bad_rects)} rects)'}"
+        )
+
+    print(f"Total: widgets() {total_old * 1000:.2f} ms, tree {total_new * 1000:.2f} ms "
+          f"(x{total_old / total_new if total_new else 0:.2f}); {mismatches} mismatches")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
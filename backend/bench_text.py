@@ -0,0 +1,110 @@
+"""
+Micro-benchmark for the text analysis path.
+
+Compares the two-pass pipeline (`clean_text` over the whole document, then
+`extract_action_steps`) with the fused single pass (`extract_action_steps_from_raw`).
+Checks that the fused normaliser yields exactly the lines of `clean_text` and that both
+paths produce identical steps. Exits 1 on any mismatch.
+
+    python -m backend.bench_text
+    python -m backend.bench_text --pages 200 --repeat 5
+    python -m backend.bench_text extracted/*.txt forms/*.pdf
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+from backend.app.services.ai_engine import extract_action_steps, extract_action_steps_from_raw
+from backend.app.utils.text_cleaner import clean_text, iter_normalized_lines
+
+SAMPLE_LINES = [
+    "APPLICATION FORM FOR ADMISSION",
+    "Full Name: ____________________",
+    "Father's Name ________  Mother's Name ________",
+    "Date of Birth (DD/MM/YYYY) :",
+    "Address\t\tfor correspondence",
+    "Mobile No.  +91 98765 43210",
+    "Email ID : ____________",
+    "Amount paid Rs. 500 / -",
+    "Fee 250 p",
+    "Category ( SC / ST / OBC / General )",
+    "Signature of the applicant",
+    "Place :",
+    "Date :",
+    "I hereby declare that the information given above is true to the best of my knowledge",
+    "Account No. 0012345678901",
+    "IFSC Code , Branch",
+    "",
+    "Roll No. ______ Class ______ Percentage ______",
+    "Course applied for :",
+    "Instructions: read carefully before filling the form",
+]
+
+
+def synthetic_document(pages: int, lines_per_page: int = 60, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return "\n".join(rng.choice(SAMPLE_LINES) for _ in range(pages * lines_per_page))
+
+
+def pdf_text(path: Path) -> str:
+    # The same text the analysis sees for a text-layer PDF
+    import fitz  # PyMuPDF
+
+    with fitz.open(path) as doc:
+        pages = (page.get_text().strip() for page in doc)
+        return "\n".join(text for text in pages if text)
+
+
+def reference_lines(text: str) -> list[str]:
+    return [line.strip() for line in clean_text(text).splitlines() if line.strip()]
+
+
+def timed(fn, text: str, repeat: int) -> tuple[float, dict]:
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark two-pass vs fused text analysis")
+    parser.add_argument("texts", nargs="*", type=Path, help="extracted text files or PDFs (default: synthetic)")
+    parser.add_argument("--pages", type=int, default=50, help="pages per synthetic document")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.texts:
+        corpus = [
+            (p.name, pdf_text(p) if p.suffix.lower() == ".pdf" else p.read_text(encoding="utf-8", errors="replace"))
+            for p in args.texts
+        ]
+    else:
+        corpus = [(f"synthetic-{n}p", synthetic_document(n, seed=n)) for n in (1, 10, args.pages)]
+
+    mismatches = 0
+    total_old = total_new = 0.0
+    for name, text in corpus:
+        old_s, old = timed(lambda t: extract_action_steps(clean_text(t)), text, args.repeat)
+        new_s, new = timed(extract_action_steps_from_raw, text, args.repeat)
+        same = old == new and list(iter_normalized_lines(text)) == reference_lines(text)
+        mismatches += not same
+        total_old += old_s
+        total_new += new_s
+        print(
+            f"{name:<24} {len(text):>9} chars  two-pass {old_s * 1000:8.2f} ms  "
+            f"fused {new_s * 1000:8.2f} ms  x{old_s / new_s if new_s else 0:5.2f}  "
+            f"{'identical' if same else 'MISMATCH'}"
+        )
+
+    print(f"Total: two-pass {total_old * 1000:.2f} ms, fused {total_new * 1000:.2f} ms "
+          f"(x{total_old / total_new if total_new else 0:.2f}); {mismatches} mismatches")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
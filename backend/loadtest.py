@@ -0,0 +1,338 @@
+"""
+Local load generator for the upload endpoints.
+
+Starts uvicorn on a free local port (unless --url is given), replays a corpus of
+documents against /upload/analyze and /upload/fill, and reports throughput,
+p50/p95/p99 latency and error rates per document type. With --baseline the run
+fails (exit code 1) when it regresses beyond --threshold.
+
+Every request carries a uniquely perturbed copy of its document, so the server's
+content-hash caches never answer it; pass --allow-cache to replay identical bytes.
+
+    python -m backend.loadtest --corpus samples/ --concurrency 8 --duration 60
+    python -m backend.loadtest --corpus samples/ --rate 4 --baseline loadtest-baseline.json
+    python -m backend.loadtest --corpus samples/ --save-baseline loadtest-baseline.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+from uuid import uuid4
+
+CORPUS_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg", ".docx"}
+CONTENT_TYPES = {
+    ".pdf": "application/pdf",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+
+# ---------- HTTP ----------
+
+def encode_multipart(fields: dict, files: dict) -> tuple[bytes, str]:
+    boundary = uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, (filename, content, content_type) in files.items():
+        parts.append(
+            (
+                f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                f"Content-Type: {content_type}\r\n\r\n"
+            ).encode()
+            + content
+            + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+async def post(host: str, port: int, path: str, body: bytes, content_type: str) -> tuple[int, bytes]:
+    """Minimal HTTP/1.1 POST over asyncio streams (one connection per request)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        head = (
+            f"POST {path} HTTP/1.1\r\nHost: {host}:{port}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+        )
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        if "content-length" in headers:
+            payload = await reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).strip(), 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            payload = b"".join(chunks)
+        else:
+            payload = await reader.read()
+        return status, payload
+    finally:
+        writer.close()
+
+
+# ---------- CORPUS ----------
+
+def load_corpus(corpus: Path) -> list[dict]:
+    docs = []
+    for path in sorted(corpus.rglob("*")):
+        suffix = path.suffix.lower()
+        if path.is_file() and suffix in CORPUS_EXTENSIONS:
+            docs.append({"name": path.name, "type": suffix.lstrip("."), "suffix": suffix, "content": path.read_bytes()})
+    return docs
+
+
+def perturb(content: bytes, suffix: str) -> bytes:
+    """Return a copy of `content` with a random nonce the parsers ignore."""
+    nonce = uuid4().hex.encode()
+    if suffix == ".docx":
+        # Replace the zip archive comment (the tail of the end-of-central-directory record)
+        eocd = content.rfind(b"PK\x05\x06")
+        if eocd != -1:
+            return content[:eocd + 20] + len(nonce).to_bytes(2, "little") + nonce
+    if suffix == ".pdf":
+        return content + b"\n%" + nonce + b"\n"
+    # PNG and JPEG decoders stop at their end marker
+    return content + nonce
+
+
+def build_requests(docs: list[dict], include_fill: bool) -> list[dict]:
+    reqs = []
+    for doc in docs:
+        reqs.append({"endpoint": "analyze", "type": doc["type"], "path": "/upload/analyze", "doc": doc, "fields": {}})
+        if include_fill and doc["suffix"] == ".pdf":
+            reqs.append({"endpoint": "fill", "type": doc["type"], "path": "/upload/fill", "doc": doc, "fields": {"data": "{}"}})
+    return reqs
+
+
+def encode_request(req: dict, allow_cache: bool) -> tuple[bytes, str]:
+    doc = req["doc"]
+    content = doc["content"] if allow_cache else perturb(doc["content"], doc["suffix"])
+    return encode_multipart(req["fields"], {"file": (doc["name"], content, CONTENT_TYPES[doc["suffix"]])})
+
+
+# ---------- RUN ----------
+
+async def run_load(host, port, reqs, concurrency, rate, duration, max_requests, seed,
+                   timeout=120.0, allow_cache=False) -> list[dict]:
+    rng = random.Random(seed)
+    samples = []
+    sem = asyncio.Semaphore(concurrency)
+    deadline = time.perf_counter() + duration
+    budget = {"left": max_requests or float("inf")}
+
+    def next_request():
+        if time.perf_counter() >= deadline or budget["left"] <= 0:
+            return None
+        budget["left"] -= 1
+        return rng.choice(reqs)
+
+    async def one(req):
+        body, ctype = encode_request(req, allow_cache)
+        start = time.perf_counter()
+        try:
+            # A request past the timeout counts as an error rather than stalling its client
+            status, _ = await asyncio.wait_for(post(host, port, req["path"], body, ctype), timeout)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError, IndexError):
+            status = 0
+        samples.append({
+            "key": f'{req["endpoint"]}:{req["type"]}',
+            "status": status,
+            "latency": time.perf_counter() - start,
+        })
+
+    if rate:
+        # Open loop: Poisson arrivals; concurrency only caps in-flight requests
+        async def limited(req):
+            async with sem:
+                await one(req)
+
+        tasks = set()
+        while (req := next_request()) is not None:
+            task = asyncio.create_task(limited(req))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            await asyncio.sleep(rng.expovariate(rate))
+        await asyncio.gather(*tasks)
+    else:
+        # Closed loop: `concurrency` clients, each sending its next request on completion
+        async def client():
+            while (req := next_request()) is not None:
+                await one(req)
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+    return samples
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    idx = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+def summarize(samples: list[dict], elapsed: float) -> dict:
+    groups = {}
+    for s in samples:
+        groups.setdefault(s["key"], []).append(s)
+        groups.setdefault("all", []).append(s)
+    report = {}
+    for key, items in sorted(groups.items()):
+        ok = sorted(s["latency"] for s in items if 200 <= s["status"] < 300)
+        rejected = sum(1 for s in items if s["status"] == 429)
+        errors = sum(1 for s in items if not (200 <= s["status"] < 300) and s["status"] != 429)
+        report[key] = {
+            "requests": len(items),
+            "throughput_rps": round(len(ok) / elapsed, 3) if elapsed else 0.0,
+            "p50_ms": round(percentile(ok, 50) * 1000, 1),
+            "p95_ms": round(percentile(ok, 95) * 1000, 1),
+            "p99_ms": round(percentile(ok, 99) * 1000, 1),
+            "rejected_rate": round(rejected / len(items), 4),
+            "error_rate": round(errors / len(items), 4),
+        }
+    return report
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[str]:
+    """Return human-readable regressions; latency/throughput use a relative threshold."""
+    failures = []
+    for key, base in baseline.items():
+        cur = report.get(key)
+        if cur is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if base[metric] and cur[metric] > base[metric] * (1 + threshold):
+                failures.append(f"{key} {metric}: {cur[metric]} > {base[metric]} (+{threshold:.0%})")
+        if base["throughput_rps"] and cur["throughput_rps"] < base["throughput_rps"] * (1 - threshold):
+            failures.append(f'{key} throughput_rps: {cur["throughput_rps"]} < {base["throughput_rps"]} (-{threshold:.0%})')
+        for metric in ("error_rate", "rejected_rate"):
+            if cur[metric] > base[metric] + 0.01:
+                failures.append(f"{key} {metric}: {cur[metric]} > {base[metric]}")
+    return failures
+
+
+def print_report(report: dict) -> None:
+    cols = ("requests", "throughput_rps", "p50_ms", "p95_ms", "p99_ms", "rejected_rate", "error_rate")
+    print(f'{"endpoint:type":<20}' + "".join(f"{c:>16}" for c in cols))
+    for key, row in report.items():
+        print(f"{key:<20}" + "".join(f"{row[c]:>16}" for c in cols))
+
+
+# ---------- SERVER ----------
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, workers: int) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", str(port),
+           "--workers", str(workers), "--log-level", "warning"]
+    proc = subprocess.Popen(cmd)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not start within 60s")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load test /upload/analyze and /upload/fill")
+    parser.add_argument("--corpus", type=Path, required=True, help="directory of sample documents")
+    parser.add_argument("--url", help="target an already-running server instead of starting uvicorn")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers when starting a server")
+    parser.add_argument("--concurrency", type=int, default=4, help="max in-flight requests")
+    parser.add_argument("--rate", type=float, default=0.0, help="open-loop arrivals per second (0 = closed loop)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to generate load")
+    parser.add_argument("--max-requests", type=int, default=0, help="stop after this many requests (0 = no cap)")
+    parser.add_argument("--no-fill", action="store_true", help="only exercise /upload/analyze")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    parser.add_argument("--allow-cache", action="store_true",
+                        help="send identical bytes each time, so repeats may be served from the server's cache")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", type=Path, help="fail if the run regresses against this baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression (0.2 = 20%%)")
+    parser.add_argument("--save-baseline", type=Path, help="write this run's report as the new baseline")
+    parser.add_argument("--json", type=Path, help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    docs = load_corpus(args.corpus)
+    if not docs:
+        parser.error(f"no {', '.join(sorted(CORPUS_EXTENSIONS))} files found in {args.corpus}")
+    reqs = build_requests(docs, include_fill=not args.no_fill)
+
+    proc = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        host, port = "127.0.0.1", free_port()
+        proc = start_server(port, args.workers)
+
+    try:
+        started = time.perf_counter()
+        samples = asyncio.run(run_load(host, port, reqs, args.concurrency, args.rate,
+                                       args.duration, args.max_requests, args.seed,
+                                       args.timeout, args.allow_cache))
+        elapsed = time.perf_counter() - started
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    report = summarize(samples, elapsed)
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(report, indent=2))
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        failures = compare(report, json.loads(args.baseline.read_text()), args.threshold)
+        if failures:
+            print("\nRegressions against baseline:")
+            for f in failures:
+                print(f"  - {f}")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from backend.app.routes.upload import router as upload_router
+from backend.app.routes.debug import router as debug_router
+from backend.app.utils.profiling import profile_requests
 
 
 app = FastAPI(
@@ -18,12 +20,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Stage timings for every request; slow or opted-in requests leave a profile report
+app.middleware("http")(profile_requests)
+
 app.include_router(
     upload_router,
     prefix="/upload",
     tags=["PDF Upload"]
 )
 
+app.include_router(
+    debug_router,
+    prefix="/debug",
+    tags=["Debug"],
+    include_in_schema=False,
+)
+
 @app.get("/", tags=["Health"])
 def health_check():
     return {"status": "paperPilot backend running"}
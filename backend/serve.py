@@ -0,0 +1,138 @@
+"""
+Production launcher: pre-fork workers that share preloaded models.
+
+Heavy dependencies (PyMuPDF, NumPy, Pillow, python-docx, EasyOCR/torch) and the OCR
+readers are loaded once in the parent. Workers are then forked from it, so model
+weights stay in copy-on-write pages shared by every worker instead of being loaded
+N times. Cross-worker state (analysis results) goes through the SQLite shared cache.
+
+    python -m backend.serve --workers 4 --host 0.0.0.0 --port 8000
+
+Requires os.fork (Linux/macOS). On other platforms use uvicorn directly.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+from backend.app.config import PRELOAD_OCR_LANGUAGES
+
+
+def preload(ocr_languages: list[str]):
+    import fitz  # noqa: F401
+    import numpy  # noqa: F401
+    from PIL import Image  # noqa: F401
+    from docx import Document  # noqa: F401
+
+    from backend.main import app
+    from backend.app.services.ocr_pool import reader_pool
+
+    for langs in ocr_languages:
+        try:
+            reader_pool.get(langs.split("+"))
+            logging.info("Preloaded OCR reader: %s", langs)
+        except ImportError:
+            logging.warning("easyocr is not installed; skipping OCR preload")
+            break
+    return app
+
+
+def run_worker(app, sock: socket.socket, workers: int, log_level: str) -> None:
+    from backend.app.services.admission import admission
+
+    # Each worker gets its share of the node's CPU/memory budget
+    admission.memory_budget_mb = admission.memory_budget_mb / workers
+    admission.cpu_budget = max(1.0, admission.cpu_budget / workers)
+    try:
+        import torch  # type: ignore
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+    except ImportError:
+        pass
+
+    config = uvicorn.Config(app, log_level=log_level, lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run paperPilot with pre-forked workers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--ocr", default=",".join(PRELOAD_OCR_LANGUAGES),
+                        help='OCR language sets to preload, e.g. "en,hi+en" ("" to skip)')
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s [%(process)d] %(message)s")
+    if not hasattr(os, "fork"):
+        logging.error("os.fork is unavailable; run `python -m uvicorn backend.main:app` instead")
+        return 1
+
+    app = preload([s for s in args.ocr.split(",") if s.strip()])
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # Move everything loaded so far out of the GC's reach so collections in the
+    # workers don't touch (and un-share) these pages
+    gc.collect()
+    gc.freeze()
+
+    children = {}
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                run_worker(app, sock, args.workers, args.log_level)
+            finally:
+                os._exit(0)
+        children[pid] = time.monotonic()
+
+    def shutdown(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    for _ in range(args.workers):
+        spawn()
+    logging.info("Serving on http://%s:%d with %d workers", args.host, args.port, args.workers)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+        logging.warning("Worker %d exited (status %d); restarting", pid, status)
+        if time.monotonic() - started < 1.0:
+            time.sleep(1.0)  # avoid a tight crash loop
+        spawn()
+
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -39,6 +39,8 @@ export async function POST(request: Request) {
 
     const forward = new FormData();
     forward.append('file', file, (file as any).name || 'upload');
+    const languages = formData.get('languages');
+    if (typeof languages === 'string' && languages) forward.append('languages', languages);
 
     const controller = new AbortController();
     const timeoutMs = 180_000;
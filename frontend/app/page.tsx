@@ -60,7 +60,7 @@ export default function Home() {
     }
   };
 
-  const handleFileSelect = async (file: File) => {
+  const handleFileSelect = async (file: File, languages: string = '') => {
     setIsLoading(true);
     setError(null);
     
@@ -68,6 +68,7 @@ export default function Home() {
       const buildFormData = () => {
         const fd = new FormData();
         fd.append('file', file);
+        if (languages) fd.append('languages', languages);
         return fd;
       };
 
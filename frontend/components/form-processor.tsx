@@ -16,6 +16,24 @@ interface Field {
   label: string;
   tip?: string;
   suggested_answer?: string;
+  // Declared by the PDF's AcroForm field, when there is one
+  type_name?: string;
+  options?: string[];
+  option_values?: string[];
+  max_length?: number;
+  required?: boolean;
+  read_only?: boolean;
+}
+
+// Companion guide served by /upload/guide, fetched when a field is expanded
+interface FieldGuide {
+  label: string;
+  intent: string;
+  what_it_is: string;
+  how_to_fill: string;
+  where_to_find: string;
+  common_mistakes: string;
+  example_answer: string;
 }
 
 interface Step {
@@ -36,6 +54,7 @@ interface FormProcessorProps {
   file?: File | null;
   analysisData?: {
     filename: string;
+    saved_as?: string;
     action_overview: string;
     total_steps: number;
     mandatory: number;
@@ -109,6 +128,7 @@ function getDefaultSuggestion(label: string): string {
 }
 
 function isCheckboxField(field: Field): boolean {
+  if (field.type_name) return field.type_name === 'checkbox';
   const raw = `${field.label} ${field.tip ?? ''}`.toLowerCase();
   // Keywords indicating a checkbox/tick option
   const checkboxKeywords = [
@@ -130,6 +150,9 @@ function isCheckboxField(field: Field): boolean {
 }
 
 function extractChoiceOptions(field: Field): string[] {
+  // Dropdowns, list boxes and radio groups carry their real choices
+  if (field.options && field.options.length > 0) return field.options;
+
   const raw = `${field.label} ${field.tip ?? ''}`.toLowerCase();
 
   if (raw.includes('gender')) {
@@ -229,6 +252,14 @@ function isInformationalField(field: Field): boolean {
 }
 
 function sanitizeSuggestionForField(field: Field, suggestion: string): string {
+  if (field.options && field.option_values) {
+    // Export values differ from the shown text: answers hold the export value
+    const exports = field.option_values;
+    if (exports.includes(suggestion)) return suggestion;
+    const shown = sanitizeSuggestionForField({ ...field, option_values: undefined }, suggestion);
+    return exports[field.options.indexOf(shown)] ?? exports[0];
+  }
+
   const options = extractChoiceOptions(field);
   if (options.length > 0) {
     const s = (suggestion || '').toLowerCase();
@@ -262,6 +293,17 @@ function shouldShowRequirementLabel(step: Step): boolean {
   return explicit;
 }
 
+// Same normalisation as the backend guide cache (companion_steps.normalize_label), so
+// "Date of Birth:", "1. date of birth" and "DATE OF BIRTH *" share one request
+function guideKey(label: string): string {
+  return label
+    .replace(/\s+/g, ' ')
+    .trim()
+    .replace(/^\s*(?:\(?[0-9]{1,3}[.)]|\(?[a-z]\)|\(?[ivx]{1,4}\))\s+/i, '')
+    .replace(/[\s:*_.\-–]+$/, '')
+    .toLowerCase();
+}
+
 function getFieldGuide(field: Field): { title: string; lines: string[]; template?: string } | null {
   const raw = `${field.label} ${field.tip ?? ''}`.toLowerCase();
   const lines: string[] = [];
@@ -681,12 +723,15 @@ export function FormProcessor({
   const [completedSteps, setCompletedSteps] = useState<Set<number>>(new Set());
   const [skippedSteps, setSkippedSteps] = useState<Set<number>>(new Set());
   const [expandedFields, setExpandedFields] = useState<Set<string>>(new Set());
+  const [fieldGuides, setFieldGuides] = useState<Record<string, FieldGuide>>({});
   const [answers, setAnswers] = useState<Record<string, string>>({});
   const [draftedAnswers, setDraftedAnswers] = useState<Record<string, boolean>>({});
   const [previewExpanded, setPreviewExpanded] = useState(true);
   const [reviewMode, setReviewMode] = useState(false);
 
   const signatureInputRef = useRef<HTMLInputElement | null>(null);
+  // Guide keys with a request in flight; failed requests are dropped so they can be retried
+  const guideRequests = useRef<Set<string>>(new Set());
   const [signaturePreview, setSignaturePreview] = useState<string | null>(null);
   const [signatureFile, setSignatureFile] = useState<File | null>(null);
 
@@ -716,7 +761,28 @@ export function FormProcessor({
      Handlers
   ========================= */
 
-  const toggleFieldExpanded = (key: string) => {
+  const loadFieldGuide = async (label: string) => {
+    // Guides are built on demand and only successful responses are kept
+    const key = guideKey(label);
+    if (!key || key in fieldGuides || guideRequests.current.has(key)) return;
+    guideRequests.current.add(key);
+    try {
+      const backendBase = process.env.NEXT_PUBLIC_BACKEND_URL || 'http://127.0.0.1:8000';
+      const res = await fetch(`${backendBase}/upload/guide?label=${encodeURIComponent(label)}`);
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      const guide: FieldGuide = await res.json();
+      setFieldGuides((prev) => ({ ...prev, [key]: guide }));
+    } catch (e) {
+      console.error('Guide request failed', e);
+    } finally {
+      guideRequests.current.delete(key);
+    }
+  };
+
+  const toggleFieldExpanded = (key: string, field?: Field) => {
+    if (field && !expandedFields.has(key)) {
+      void loadFieldGuide(field.label);
+    }
     setExpandedFields((prev) => {
       const next = new Set(prev);
       next.has(key) ? next.delete(key) : next.add(key);
@@ -811,15 +877,24 @@ export function FormProcessor({
         });
       }
 
-      const formData = new FormData();
-      formData.append('file', file);
-      formData.append('data', JSON.stringify(fieldData));
-      if (signatureFile) formData.append('signature', signatureFile);
+      const fill = (useSaved: boolean) => {
+        const formData = new FormData();
+        if (useSaved && analysisData.saved_as) formData.append('saved_as', analysisData.saved_as);
+        else formData.append('file', file);
+        formData.append('data', JSON.stringify(fieldData));
+        if (signatureFile) formData.append('signature', signatureFile);
+        return fetch(`${backendBase}/upload/fill`, {
+          method: 'POST',
+          body: formData,
+        });
+      };
 
-      const res = await fetch(`${backendBase}/upload/fill`, {
-        method: 'POST',
-        body: formData,
-      });
+      // The backend keeps the analysed PDF, so refer to it instead of uploading it again;
+      // if it has been cleaned up since (404), send the file itself
+      let res = await fill(true);
+      if (res.status === 404 && analysisData.saved_as) {
+        res = await fill(false);
+      }
 
       if (!res.ok) {
         throw new Error('Failed to generate filled PDF');
@@ -1184,7 +1259,7 @@ export function FormProcessor({
                                       <div key={key} className="rounded-2xl border border-border bg-card overflow-hidden">
                                         <button
                                           className="w-full px-6 py-5 text-left font-semibold flex items-center justify-between"
-                                          onClick={() => toggleFieldExpanded(key)}
+                                          onClick={() => toggleFieldExpanded(key, field)}
                                         >
                                           <div className="min-w-0">
                                             <div className="truncate text-2xl text-foreground">{field.label}</div>
@@ -1224,6 +1299,22 @@ export function FormProcessor({
                                               );
                                             })()}
 
+                                            {(() => {
+                                              const cached = fieldGuides[guideKey(field.label)];
+                                              if (!cached) return null;
+                                              // The cached guide may have been fetched for a differently written label
+                                              const guide = { ...cached, label: field.label };
+                                              return (
+                                                <div className="rounded-xl border border-border bg-muted/40 px-6 py-5 space-y-2">
+                                                  <div className="text-2xl text-foreground leading-relaxed">{guide.what_it_is}</div>
+                                                  <div className="text-2xl text-muted-foreground leading-relaxed">How to fill it: {guide.how_to_fill}</div>
+                                                  <div className="text-2xl text-muted-foreground leading-relaxed">Where to find it: {guide.where_to_find}</div>
+                                                  <div className="text-2xl text-muted-foreground leading-relaxed">Common mistakes: {guide.common_mistakes}</div>
+                                                  <div className="text-2xl text-muted-foreground leading-relaxed">Example: {guide.example_answer}</div>
+                                                </div>
+                                              );
+                                            })()}
+
                                             {isSignature ? (
                                               <>
                                                 <input
@@ -1264,8 +1355,8 @@ export function FormProcessor({
                                                 onChange={(e) => setAnswers((prev) => ({ ...prev, [key]: e.target.value }))}
                                                 className="w-full h-14 px-4 rounded-lg border border-border bg-background text-foreground text-lg focus:outline-none focus:ring-2 focus:ring-primary"
                                               >
-                                                {options.map((o) => (
-                                                  <option key={o} value={o}>
+                                                {options.map((o, i) => (
+                                                  <option key={o} value={field.option_values?.[i] ?? o}>
                                                     {o}
                                                   </option>
                                                 ))}
@@ -1274,6 +1365,7 @@ export function FormProcessor({
                                               <textarea
                                                 className="w-full px-4 py-3 rounded-lg border border-border bg-background text-foreground placeholder-muted-foreground text-lg focus:outline-none focus:ring-2 focus:ring-primary focus:border-transparent resize-none shadow-sm"
                                                 rows={3}
+                                                maxLength={field.max_length}
                                                 value={value}
                                                 onChange={(e) => setAnswers((prev) => ({ ...prev, [key]: e.target.value }))}
                                               />
@@ -4,8 +4,18 @@ import React from "react"
 import { useState, useRef } from 'react';
 import { Upload, Lock } from 'lucide-react';
 
+// OCR languages for scanned documents (sent as the `languages` form field; empty lets
+// the backend detect the script of each page)
+const DOCUMENT_LANGUAGES = [
+  { value: '', label: 'Detect automatically' },
+  { value: 'en', label: 'English' },
+  { value: 'hi,en', label: 'हिन्दी / Hindi' },
+  { value: 'mr,en', label: 'मराठी / Marathi' },
+  { value: 'ta,en', label: 'தமிழ் / Tamil' },
+];
+
 interface UploadCardProps {
-  onFileSelect: (file: File) => void;
+  onFileSelect: (file: File, languages: string) => void;
   isLoading?: boolean;
   onDemoClick?: () => void; // Declare the onDemoClick variable
 }
@@ -13,6 +23,7 @@ interface UploadCardProps {
 export function UploadCard({ onFileSelect, isLoading }: UploadCardProps) {
   const [isDragActive, setIsDragActive] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  const [languages, setLanguages] = useState('');
   const fileInputRef = useRef<HTMLInputElement>(null);
 
   const validTypes = ['application/pdf', 'image/png', 'image/jpeg', 'image/jpg', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'];
@@ -58,7 +69,7 @@ export function UploadCard({ onFileSelect, isLoading }: UploadCardProps) {
     if (files && files[0]) {
       const file = files[0];
       if (validateFile(file)) {
-        onFileSelect(file);
+        onFileSelect(file, languages);
       }
     }
   };
@@ -67,7 +78,7 @@ export function UploadCard({ onFileSelect, isLoading }: UploadCardProps) {
     const files = e.target.files;
     if (files && files[0]) {
       if (validateFile(files[0])) {
-        onFileSelect(files[0]);
+        onFileSelect(files[0], languages);
       }
     }
   };
@@ -128,6 +139,23 @@ export function UploadCard({ onFileSelect, isLoading }: UploadCardProps) {
         </button>
       </div>
 
+      <div className="flex items-center gap-4 text-xl text-muted-foreground justify-center">
+        <label htmlFor="document-language">Document language</label>
+        <select
+          id="document-language"
+          value={languages}
+          onChange={(e) => setLanguages(e.target.value)}
+          disabled={isLoading}
+          className="h-12 px-4 rounded-lg border border-border bg-background text-foreground text-xl focus:outline-none focus:ring-2 focus:ring-primary"
+        >
+          {DOCUMENT_LANGUAGES.map((l) => (
+            <option key={l.value} value={l.value}>
+              {l.label}
+            </option>
+          ))}
+        </select>
+      </div>
+
       {error && (
         <div className="bg-red-50 border border-red-200 rounded-lg p-4 space-y-2">
           <p className="text-sm font-semibold text-red-700">Upload Error</p>